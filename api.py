@@ -0,0 +1,198 @@
+# api.py
+
+"""Versioned JSON API for the student data, mounted by app.py under /api/v1.
+
+Everything is answered from the shared store's indices. Batch endpoints take
+many rolls or sections per request. GET responses carry an ETag built from
+the data tag and the request URL, so a client that sends If-None-Match gets
+304 without the lookup being repeated until the data is reloaded.
+
+GET  /api/v1/students/<roll>                 one student
+GET  /api/v1/students?roll=A&roll=B          many students (or rolls=A,B)
+POST /api/v1/students   {"rolls": [...]}     many students
+GET  /api/v1/sections?year=3                 counts for every section
+GET  /api/v1/sections/<year>/<section>       one section, with its students
+POST /api/v1/sections   {"sections": [{"year": "3", "section": "CSE-05"}, ...],
+                         "students": false}  counts (and students) for many
+GET  /api/v1/version                         data version and row count
+"""
+
+import hashlib
+import json
+
+from flask import Blueprint, Response, request
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library encoder works, only slower
+    orjson = None
+
+from student_store import parse_section, section_code, shared_store
+
+# Largest batch accepted in one request
+MAX_BATCH = 1000
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+data = shared_store('data.xlsx')
+
+
+class ApiError(Exception):
+    """Raised for a request the API can't answer; becomes a JSON error response."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+@api.errorhandler(ApiError)
+def api_error(e):
+    return json_response({'error': str(e)}, e.status)
+
+
+def etag_for_request():
+    """Strong ETag for the current request: the same URL and data always give the same body."""
+    return hashlib.blake2b(f"{data.tag} {request.full_path}".encode(), digest_size=12).hexdigest()
+
+
+def conditional(render):
+    """Answer 304 if the client already has this response; otherwise call `render(store)`."""
+    # The tag is read before the store, so a reload in between can only pair
+    # newer data with an older tag, which the next request revalidates
+    etag = etag_for_request()
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = json_response(render(data.current))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # Revalidate; the data can change at any reload
+    return response
+
+
+def batch(values, name):
+    if not isinstance(values, list) or not values:
+        raise ApiError(f"'{name}' must be a non-empty list")
+    if len(values) > MAX_BATCH:
+        raise ApiError(f"At most {MAX_BATCH} {name} per request")
+    return values
+
+
+def json_body():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise ApiError("Expected a JSON object")
+    return body
+
+
+def students_payload(store, rolls):
+    students = {}
+    missing = []
+    for roll in rolls:
+        student = store.get(str(roll))
+        if student is None:
+            missing.append(roll)
+        else:
+            students[str(roll)] = student
+    return {'data_version': store.version, 'students': students, 'missing': missing}
+
+
+def section_payload(year, code, section, with_students):
+    payload = {
+        'year': year,
+        'section': code,
+        'total': section.total,
+        'male': section.male,
+        'female': section.female,
+        'day_scholars': section.day_scholars,
+    }
+    if with_students:
+        payload['students'] = list(section.students)
+    return payload
+
+
+def requested_sections(items):
+    """Parse [{"year": "3", "section": "CSE-05"}, ...] into (year, section) pairs."""
+    pairs = []
+    for item in items:
+        if not isinstance(item, dict) or str(item.get('year')) not in ('2', '3') \
+                or parse_section(item.get('section')) is None:
+            raise ApiError(f"Not a year and section: {json.dumps(item)}")
+        pairs.append((str(item['year']), item['section']))
+    return pairs
+
+
+@api.route('/students/<roll>', methods=['GET'])
+def student(roll):
+    if roll not in data.current:
+        raise ApiError("Student not found", 404)
+    return conditional(lambda store: {'data_version': store.version, 'student': store.get(roll)})
+
+
+@api.route('/students', methods=['GET'])
+def students_by_query():
+    rolls = request.args.getlist('roll')
+    for value in request.args.getlist('rolls'):
+        rolls.extend(roll for roll in value.split(',') if roll)
+    rolls = batch(rolls, 'rolls')
+    return conditional(lambda store: students_payload(store, rolls))
+
+
+@api.route('/students', methods=['POST'])
+def students_batch():
+    rolls = batch(json_body().get('rolls'), 'rolls')
+    return json_response(students_payload(data.current, rolls))
+
+
+@api.route('/sections', methods=['GET'])
+def sections():
+    year = request.args.get('year')
+    if year not in (None, '2', '3'):
+        raise ApiError("year must be 2 or 3")
+    return conditional(lambda store: {
+        'data_version': store.version,
+        'sections': [section_payload(y, code, section, False) for y, code, section in store.sections(year)],
+    })
+
+
+@api.route('/sections/<year>/<code>', methods=['GET'])
+def section(year, code):
+    if year not in ('2', '3') or data.current.section(year, code) is None:
+        raise ApiError("Section not found", 404)
+    with_students = request.args.get('students', '1') != '0'
+    return conditional(lambda store: {
+        'data_version': store.version,
+        **section_payload(year, section_code(*parse_section(code)), store.section(year, code), with_students),
+    })
+
+
+@api.route('/sections', methods=['POST'])
+def sections_batch():
+    body = json_body()
+    pairs = requested_sections(batch(body.get('sections'), 'sections'))
+    with_students = bool(body.get('students', False))
+    store = data.current
+
+    found = []
+    missing = []
+    for year, code in pairs:
+        section = store.section(year, code)
+        if section is None:
+            missing.append({'year': year, 'section': code})
+        else:
+            found.append(section_payload(year, section_code(*parse_section(code)), section, with_students))
+    return json_response({'data_version': store.version, 'sections': found, 'missing': missing})
+
+
+@api.route('/version', methods=['GET'])
+def version():
+    return json_response({**data.stats(), 'tag': data.tag})
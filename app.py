@@ -1,27 +1,69 @@
 
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
+import time
 
-app = Flask(__name__)
+from flask import Flask, Response, redirect, render_template, request, jsonify, g, url_for
 
-df = pd.read_excel('data.xlsx', dtype={'roll': str, 'phone': str})
+from api import api
+from config import PAGE_MAX_AGE
+from metrics import HTTP_SECONDS, REGISTRY, cache_gauges
+from page_cache import make_page, page_response
+from render import hostel_label
+from render_cache import RenderCache
+from student_store import parse_section, section_code, shared_store
+
+# The templates sit next to this file rather than in templates/
+app = Flask(__name__, template_folder='.')
+app.register_blueprint(api)  # JSON API under /api/v1
+
+# Reloaded in the background whenever the file changes; views read data.current
+data = shared_store('data.xlsx')
+data.watch()
+
+# Rendered and compressed section and student pages, reused until the data is reloaded
+page_cache = RenderCache()
+cache_gauges('web_page_cache', page_cache)
+REGISTRY.gauge('student_data_version', "Version of the loaded student data.", lambda: data.version)
+REGISTRY.gauge('student_data_rebuild_seconds', "Duration of the last data rebuild.",
+               lambda: data.last_rebuild_seconds)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    HTTP_SECONDS.observe(time.perf_counter() - g.request_start, request.endpoint or 'unknown')
+    return response
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/student', methods=['POST'])
-def get_student_info():
-    roll_number = request.form['roll_number']
-    student_data = df[df['roll'] == roll_number]
-    if not student_data.empty:
-        student = student_data.iloc[0].to_dict()
+def render_student_page(store, roll_number):
+    student = store.get(roll_number)  # Empty fields are already dropped
+    if student is not None:
+        return make_page(render_template('student_info.html', student=student))
+    return make_page(render_template('student_info.html', error="Student not found"), 404)
 
-        # Remove keys with NaN values
-        student = {k: v for k, v in student.items() if pd.notna(v)}
+def render_section_page(store, year, code):
+    # Counts and the student list were computed when the data was loaded
+    section_info = store.section(year, code)
+    if section_info is not None:
+        return make_page(render_template('section_info.html', 
+                                         total=section_info.total, 
+                                         male=section_info.male, 
+                                         female=section_info.female, 
+                                         day_scholars=section_info.day_scholars,
+                                         students=section_info.students))
+    return make_page(render_template('section_info.html', error="Section not found"), 404)
 
-        return render_template('student_info.html', student=student)
-    return render_template('student_info.html', error="Student not found")
+# The forms post here and are sent on to the cacheable GET pages below
+@app.route('/student', methods=['POST'])
+def get_student_info():
+    roll_number = request.form['roll_number'].strip()
+    if not roll_number or '/' in roll_number:
+        return render_template('student_info.html', error="Student not found"), 404
+    return redirect(url_for('student_page', roll_number=roll_number), 303)
 
 @app.route('/section', methods=['POST'])
 def get_section_info():
@@ -29,31 +71,66 @@ def get_section_info():
     section = request.form['section']
     year = request.form.get('year')  # Get the year from the form
 
-    # Determine the correct column based on the year
-    if year == '2':
-        section_column = 'sec2nd'
-    elif year == '3':
-        section_column = 'section-6th'
-    else:
+    if year not in ('2', '3'):
         return render_template('section_info.html', error="Invalid year selected")
 
     # Construct the full section name#+
-    full_section = f"{branch}-{section.zfill(2)}"#+
-    # Filter the DataFrame based on the selected section and year
-
-    section_data = df[df[section_column].str.contains(full_section, na=False)]#+
-    if not section_data.empty:
-        total_students = len(section_data)
-        male_students = section_data['hostel'].str.startswith('KP').sum()
-        female_students = section_data['hostel'].str.startswith('QC').sum()
-        day_scholars = total_students - male_students - female_students
-        return render_template('section_info.html', 
-                               total=total_students, 
-                               male=male_students, 
-                               female=female_students, 
-                               day_scholars=day_scholars,
-                               students=section_data.to_dict('records'))
-    return render_template('section_info.html', error="Section not found")
+    key = parse_section(f"{branch}-{section.zfill(2)}")#+
+    if key is None:
+        return render_template('section_info.html', error="Section not found"), 404
+    return redirect(url_for('section_page', year=year, code=section_code(*key)), 303)
+
+@app.route('/student/<roll_number>', methods=['GET'])
+def student_page(roll_number):
+    store = data.current
+    page = page_cache.get_or_render(
+        ('student', roll_number), store.version, lambda: render_student_page(store, roll_number))
+    # Personal details: browsers may keep the page, shared proxies may not
+    return page_response(page, request, f'private, max-age={PAGE_MAX_AGE}')
+
+@app.route('/section/<year>/<code>', methods=['GET'])
+def section_page(year, code):
+    key = parse_section(code)
+    if year not in ('2', '3') or key is None:
+        return render_template('section_info.html', error="Section not found"), 404
+
+    store = data.current
+    code = section_code(*key)
+    page = page_cache.get_or_render(
+        ('section', year, code), store.version, lambda: render_section_page(store, year, code))
+    return page_response(page, request, f'public, max-age={PAGE_MAX_AGE}')
+
+@app.route('/name', methods=['GET'])
+def search_by_name():
+    name = request.args.get('q', '')
+    # Pages count from 0; out-of-range values are clamped rather than rejected
+    page = max(request.args.get('page', 0, type=int), 0)
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
+
+    total, students = data.current.search_names(name, page * per_page, per_page)
+    return jsonify({
+        'query': name,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'results': [
+            {
+                'name': student.get('name'),
+                'roll': student.get('roll'),
+                'section': student.get('section-6th'),
+                'hostel': hostel_label(student.get('hostel')),
+            }
+            for student in students
+        ],
+    })
+
+@app.route('/version', methods=['GET'])
+def data_version():
+    return jsonify({**data.stats(), 'page_cache': page_cache.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    app.run(debug=True)  # Development only; use serve.py for multiple workers
@@ -0,0 +1,38 @@
+# bench_broadcast.py
+
+"""Run a broadcast against FakeBot and report throughput and outcomes.
+
+Usage: python bench_broadcast.py [users] [flood_rate]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from broadcast import BroadcastStore, Broadcaster, progress_text
+from fake_bot import FakeBot
+
+
+async def run(users, flood_rate):
+    bot = FakeBot(latency=0.05, flood_rate=flood_rate, blocked={1, 2, 3})
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BroadcastStore(os.path.join(tmp, 'broadcast.db'))
+        broadcast_id = store.create("Hello from the benchmark", 0, range(users))
+
+        async def report(counts, done):
+            print(progress_text(counts, done))
+
+        start = time.perf_counter()
+        counts = await Broadcaster(bot, store, progress_interval=2.0).run(broadcast_id, report)
+        elapsed = time.perf_counter() - start
+
+    print(f"\n{users} users in {elapsed:.1f} s ({counts['sent'] / elapsed:.1f} msg/s), "
+          f"{bot.floods} flood waits, {counts['failed']} failed")
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    flood_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+    asyncio.run(run(users, flood_rate))
@@ -0,0 +1,103 @@
+# bench_columnar.py
+
+"""Memory and latency of the compact StudentTable against an object-column DataFrame.
+
+The DataFrame is the table as the bot used to hold it: every cell a separate
+Python string. Both sides get the same synthetic rows, and each operation is
+done the way the old handlers did it (boolean masks, .str methods) and the
+way the store does it now.
+
+Usage: python bench_columnar.py [rows, default 1000000]
+"""
+
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from columnar import BOYS_HOSTEL, StudentTable
+from student_store import StudentStore
+from synthetic import make_students
+
+
+def median_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def fmt_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    return f"{seconds * 1e3:.1f} ms"
+
+
+def memory_report(df, table):
+    old = df.memory_usage(deep=True, index=False)
+    new = table.memory_usage()
+    print(f"{'column':<16} | {'DataFrame':>10} | {'StudentTable':>12} | stored as")
+    for column in df.columns:
+        kind = type(table._columns[column]).__name__
+        print(f"{column:<16} | {old[column] / 2**20:8.1f} MB | {new[column] / 2**20:10.1f} MB | {kind}")
+    extra = sum(value for column, value in new.items() if column not in old)
+    print(f"{'(derived)':<16} | {'':>10} | {extra / 2**20:10.1f} MB | hostel kinds")
+    total_old, total_new = old.sum(), sum(new.values())
+    print(f"{'total':<16} | {total_old / 2**20:8.1f} MB | {total_new / 2**20:10.1f} MB "
+          f"| {total_old / total_new:.1f}x smaller\n")
+
+
+def latency_report(df, table, store, rng):
+    rolls = df['roll'].tolist()
+    lookup_rolls = [rolls[i] for i in rng.integers(0, len(rolls), 50)]
+    sections = table.categorical('section-6th')
+    code = sections.categories.index('CSE-05')
+
+    cases = [
+        ("roll -> record",
+         lambda: [df[df['roll'] == roll].to_dict('records')[0] for roll in lookup_rolls[:5]], 5,
+         lambda: [store.get(roll) for roll in lookup_rolls], len(lookup_rolls)),
+        ("rows of one section",
+         lambda: df[df['section-6th'] == 'CSE-05'], 1,
+         lambda: np.flatnonzero(sections.codes == code), 1),
+        ("hostellers in a section",
+         lambda: df.loc[df['section-6th'] == 'CSE-05', 'hostel'].str.startswith('KP').sum(), 1,
+         lambda: store.section('3', 'CSE-05').male, 1),
+        ("hostellers, whole table",
+         lambda: df['hostel'].str.startswith('KP').sum(), 1,
+         lambda: np.count_nonzero(table.hostel_kinds == BOYS_HOSTEL), 1),
+        ("name search page",
+         lambda: df[df['name'].str.contains('RAHUL', case=False)].head(20).to_dict('records'), 1,
+         lambda: store.search_names('rahul', 0, 20), 1),
+    ]
+    print(f"{'operation':<24} | {'DataFrame':>10} | {'store':>10} | speedup")
+    for name, old, old_count, new, new_count in cases:
+        old_time = median_time(old, 5) / old_count
+        new_time = median_time(new, 20) / new_count
+        print(f"{name:<24} | {fmt_time(old_time):>10} | {fmt_time(new_time):>10} | {old_time / new_time:,.0f}x")
+
+
+def run(n):
+    df, made = timed(lambda: make_students(n))
+    print(f"{n:,} synthetic rows generated in {made:.1f}s\n")
+
+    table, built = timed(lambda: StudentTable(df))
+    memory_report(df, table)
+    print(f"StudentTable built in {built:.1f}s")
+    store, built = timed(lambda: StudentStore(df))
+    print(f"StudentStore (table, section pages, name index, result fragments) built in {built:.1f}s\n")
+
+    latency_report(df, store.table, store, np.random.default_rng(0))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
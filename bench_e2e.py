@@ -0,0 +1,96 @@
+# bench_e2e.py
+
+"""End-to-end run of the bot against fake_bot_api.py on one machine.
+
+Starts the fake Bot API server in a thread and the real Application from
+main.py, which long-polls it. It then hands the bot a burst of synthetic
+updates and a broadcast, and reports polling and reply latency, send
+throughput and flood waits, as measured by the fake server.
+
+Usage: python bench_e2e.py [updates] [broadcast users]
+Environment: BENCH_LATENCY (seconds per API call, default 0.02),
+BENCH_FLOOD_RATE (default 0.01)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import main
+from bench_handlers import TrafficGenerator, parse_mix, DEFAULT_MIX
+from broadcast import BroadcastStore, Broadcaster
+from command_log import CommandLog
+from fake_bot_api import FakeBotAPI, serve_in_thread
+
+LATENCY = float(os.environ.get('BENCH_LATENCY', 0.02))
+FLOOD_RATE = float(os.environ.get('BENCH_FLOOD_RATE', 0.01))
+
+
+async def wait_for_replies(api, expected, idle=3.0, timeout=300):
+    """
+    Wait until `expected` updates got a reply, or replies stop coming for
+    `idle` seconds (a reply lost to a 429 never comes). Returns the time of
+    the last reply.
+    """
+    deadline = time.monotonic() + timeout
+    replies, last_change = 0, time.monotonic()
+    while time.monotonic() < deadline:
+        stats = api.stats()
+        if stats['replies'] != replies:
+            replies, last_change = stats['replies'], time.monotonic()
+        if replies >= expected or (not stats['pending_updates'] and time.monotonic() - last_change > idle):
+            break
+        await asyncio.sleep(0.05)
+    return last_change
+
+
+async def run(update_count, broadcast_users, tmp):
+    api = FakeBotAPI(latency=LATENCY, flood_rate=FLOOD_RATE)
+    base_url, server = serve_in_thread(api, port=0)
+    main.command_log.close()
+    main.command_log = CommandLog(os.path.join(tmp, 'user_log.db'))
+    main.broadcast_store = BroadcastStore(os.path.join(tmp, 'broadcast.db'))
+
+    application = main.build_application(token="123:FAKE", base_url=base_url)
+    await application.initialize()
+    await application.start()
+    await application.updater.start_polling(poll_interval=0, timeout=10)
+    try:
+        # Handlers: a burst of updates through getUpdates, answered through the Bot API
+        mix = parse_mix(DEFAULT_MIX)
+        generator = TrafficGenerator(main.data.current.table.to_frame())
+        routes = generator.rng.choices(list(mix), weights=list(mix.values()), k=update_count)
+        start = time.monotonic()
+        api.add_updates([generator.update(route) for route in routes])
+        elapsed = await wait_for_replies(api, update_count) - start
+        stats = api.stats()
+        print(f"{update_count} updates in {elapsed:.1f} s ({stats['replies'] / elapsed:.0f} replies/s), "
+              f"{update_count - stats['replies']} unanswered (429s), "
+              f"reply latency p50 {stats['reply_latency_ms']['p50']} ms, p99 {stats['reply_latency_ms']['p99']} ms")
+
+        # Broadcast: paced sends with 429s from the fake server
+        store = main.broadcast_store
+        broadcast_id = store.create("Benchmark announcement", 0, range(1000, 1000 + broadcast_users))
+        floods_before = api.floods
+        start = time.monotonic()
+        counts = await Broadcaster(application.bot, store).run(broadcast_id)
+        elapsed = time.monotonic() - start
+        print(f"Broadcast to {broadcast_users} users in {elapsed:.1f} s "
+              f"({counts['sent'] / elapsed:.1f} msg/s), {api.floods - floods_before} flood waits, "
+              f"{counts['failed']} failed")
+        print(json.dumps(api.stats()['calls'], sort_keys=True))
+    finally:
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(updates, users, tmp))
@@ -0,0 +1,288 @@
+# bench_handlers.py
+
+"""Drive the bot's real handlers with synthetic traffic, entirely offline.
+
+Every scenario swaps a synthetic table of the requested size into main.data,
+then feeds real telegram.Update objects through handle_query and
+button_handler. A FakeBot receives the replies. The command log writes to a
+temporary database. Each scenario reports throughput, latency percentiles
+(overall and per route) and process memory. The results are written as JSON
+so two commits can be compared:
+
+    python bench_handlers.py --rows 10000 100000 --concurrency 1 32
+    python bench_handlers.py --compare bench_results/handlers-<old>.json
+
+The query mix is given as route=weight pairs, e.g.
+--mix roll=60,name=20,section=10,full_list=5,name_page=5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from telegram import Update
+
+import main
+from command_log import CommandLog
+from fake_bot import FakeBot
+from student_store import SECTION_COLUMNS, StudentStore, parse_section
+from synthetic import make_students
+
+ROUTES = ('roll', 'unknown_roll', 'name', 'section', 'legacy_section',
+          'section_button', 'full_list', 'roster_page', 'name_page')
+DEFAULT_MIX = 'roll=50,unknown_roll=5,name=20,section=8,legacy_section=2,section_button=5,full_list=3,roster_page=2,name_page=5'
+RESULTS_DIR = 'bench_results'
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        route, _, weight = part.partition('=')
+        if route not in ROUTES:
+            raise SystemExit(f"Unknown route {route!r}; choose from {', '.join(ROUTES)}")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+class TrafficGenerator:
+    """Builds raw update dicts for each route from the rows of a synthetic table."""
+
+    def __init__(self, df, seed=0):
+        self.rng = random.Random(seed)
+        # The real sheet has rows without a name or roll number
+        self.rolls = [roll for roll in df['roll'].tolist() if isinstance(roll, str) and roll]
+        self.names = [name for name in df['name'].tolist() if isinstance(name, str) and name.strip()]
+        self.sections = sorted({
+            (year,) + key
+            for year, column in SECTION_COLUMNS.items()
+            for key in map(parse_section, df[column].dropna().unique())
+            if key is not None
+        })
+        self.update_ids = iter(range(1, 1 << 62))
+
+    def _user(self):
+        user_id = self.rng.randint(1, 50_000)
+        return {'id': user_id, 'is_bot': False, 'first_name': 'Bench', 'username': f'user{user_id}'}
+
+    def _message(self, user, text):
+        return {
+            'message_id': self.rng.randint(1, 1 << 30),
+            'date': int(time.time()),
+            'chat': {'id': user['id'], 'type': 'private'},
+            'from': user,
+            'text': text,
+        }
+
+    def _name_query(self):
+        tokens = self.rng.choice(self.names).lower().split()
+        choice = self.rng.random()
+        if choice < 0.4:
+            return tokens[0]
+        if choice < 0.8:
+            return ' '.join(tokens)
+        return f"{tokens[0]} {tokens[-1][:3]}"  # Prefix of the surname, as people type it
+
+    def text(self, route):
+        rng = self.rng
+        if route == 'roll':
+            return rng.choice(self.rolls)
+        if route == 'unknown_roll':
+            return str(rng.randint(10_000_000, 19_999_999))
+        if route == 'name':
+            return self._name_query()
+        if route == 'section':
+            _, branch, number = rng.choice(self.sections)
+            return f"{branch}-{number:02d}"
+        return str(rng.randint(1, 60))  # legacy_section
+
+    def callback_data(self, route):
+        year, branch, number = self.rng.choice(self.sections)
+        if route == 'section_button':
+            return f"section_{year}_{branch}_{number:02d}"
+        if route == 'full_list':
+            return f"full_list_{year}_{branch}-{number:02d}"
+        if route == 'roster_page':
+            return f"ro_{year}_{branch}-{number:02d}_1"
+        return f"name_1_{self.rng.choice(self.names).lower().split()[0]}"  # name_page
+
+    def update(self, route):
+        user = self._user()
+        if route in ('section_button', 'full_list', 'roster_page', 'name_page'):
+            return {
+                'update_id': next(self.update_ids),
+                'callback_query': {
+                    'id': str(self.rng.randint(1, 1 << 30)),
+                    'from': user,
+                    'chat_instance': '1',
+                    'data': self.callback_data(route),
+                    'message': self._message(user, "Results"),
+                },
+            }
+        return {'update_id': next(self.update_ids), 'message': self._message(user, self.text(route))}
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {}
+    values = sorted(latencies)
+
+    def at(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1e3, 3)
+
+    return {'p50': at(0.5), 'p90': at(0.9), 'p99': at(0.99), 'max': round(values[-1] * 1e3, 3)}
+
+
+def rss_mb():
+    """Current resident set size, falling back to the peak where /proc is missing."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_scenario(rows, concurrency, requests, mix, latency, seed):
+    start = time.perf_counter()
+    df = make_students(rows, seed)
+    store = StudentStore(df, main.data.version + 1)
+    build_seconds = time.perf_counter() - start
+    main.data.current = store  # Handlers read data.current, so they now see the synthetic table
+
+    generator = TrafficGenerator(df, seed)
+    routes = generator.rng.choices(list(mix), weights=list(mix.values()), k=requests)
+    bot = FakeBot(latency=latency, seed=seed)
+    updates = [(route, Update.de_json(generator.update(route), bot)) for route in routes]
+    context = SimpleNamespace(bot=bot, args=[], application=None)
+
+    latencies = {route: [] for route in mix}
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def handle(route, update):
+        nonlocal errors
+        async with semaphore:
+            began = time.perf_counter()
+            try:
+                if update.callback_query:
+                    await main.button_handler(update, context)
+                else:
+                    await main.handle_query(update, context)
+            except Exception:
+                errors += 1
+            latencies[route].append(time.perf_counter() - began)
+
+    rss_before = rss_mb()
+    began = time.perf_counter()
+    await asyncio.gather(*(handle(route, update) for route, update in updates))
+    elapsed = time.perf_counter() - began
+
+    every = [latency for route_latencies in latencies.values() for latency in route_latencies]
+    return {
+        'rows': rows,
+        'concurrency': concurrency,
+        'requests': requests,
+        'mix': mix,
+        'bot_latency': latency,
+        'build_seconds': round(build_seconds, 3),
+        'seconds': round(elapsed, 3),
+        'throughput': round(requests / elapsed, 1),
+        'latency_ms': percentiles(every),
+        'routes': {route: dict(count=len(values), **percentiles(values))
+                   for route, values in latencies.items() if values},
+        'errors': errors,
+        'messages_sent': len(bot.sent),
+        'messages_edited': len(bot.edits),
+        'log_events_dropped': main.command_log.dropped,
+        'rss_mb_before': round(rss_before, 1),
+        'rss_mb_after': round(rss_mb(), 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_scenario(result):
+    latency = result['latency_ms']
+    print(f"{result['rows']:>9} rows | c={result['concurrency']:<4} | "
+          f"{result['throughput']:8.1f} upd/s | p50 {latency['p50']:8.2f} ms | "
+          f"p99 {latency['p99']:8.2f} ms | RSS {result['rss_mb_after']:7.1f} MB | "
+          f"{result['errors']} errors")
+    for route, stats in sorted(result['routes'].items()):
+        print(f"{'':>12}{route:<15} n={stats['count']:<6} p50 {stats['p50']:8.2f} ms  p99 {stats['p99']:8.2f} ms")
+
+
+def compare(old_path, new):
+    with open(old_path) as f:
+        old = json.load(f)
+    baseline = {(s['rows'], s['concurrency']): s for s in old['scenarios']}
+    print(f"\nCompared with {old_path} ({old.get('commit')}):")
+    for scenario in new['scenarios']:
+        before = baseline.get((scenario['rows'], scenario['concurrency']))
+        if before is None:
+            continue
+        throughput = scenario['throughput'] / before['throughput'] - 1
+        p99 = scenario['latency_ms']['p99'] / before['latency_ms']['p99'] - 1
+        print(f"{scenario['rows']:>9} rows | c={scenario['concurrency']:<4} | "
+              f"throughput {throughput:+.1%} | p99 {p99:+.1%}")
+
+
+async def run(args):
+    mix = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as tmp:
+        main.command_log.close()
+        main.command_log = CommandLog(os.path.join(tmp, 'bench_log.db'))
+        scenarios = []
+        try:
+            for rows in args.rows:
+                for concurrency in args.concurrency:
+                    result = await run_scenario(rows, concurrency, args.requests, mix, args.latency, args.seed)
+                    print_scenario(result)
+                    scenarios.append(result)
+        finally:
+            main.command_log.close()
+
+    return {
+        'commit': git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scenarios': scenarios,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the bot handlers offline.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 32])
+    parser.add_argument('--requests', type=int, default=2000, help="updates per scenario")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="route=weight pairs")
+    parser.add_argument('--latency', type=float, default=0.0, help="simulated Bot API latency in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help=f"JSON results file (default {RESULTS_DIR}/handlers-<commit>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    output = args.output or os.path.join(RESULTS_DIR, f"handlers-{results['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {output}")
+    if args.compare:
+        compare(args.compare, results)
+    sys.exit(1 if any(s['errors'] for s in results['scenarios']) else 0)
@@ -0,0 +1,56 @@
+# bench_name_search.py
+
+"""Query latency of the trigram name index against the old str.contains scan.
+
+Usage: python bench_name_search.py [rows]
+"""
+
+import sys
+import time
+
+from name_search import NameIndex
+from synthetic import make_students
+
+QUERIES = [
+    "rahul",            # common exact token
+    "sayani mondal",    # two tokens
+    "sour",             # prefix
+    "souramy bhowmk",   # typos
+    "kumar m",          # token plus one-letter prefix
+    "zzzz",             # no match
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(n, repeats=20):
+    df = make_students(n)
+    names = df['name']
+
+    start = time.perf_counter()
+    index = NameIndex(names.tolist())
+    print(f"{n} names, index built in {time.perf_counter() - start:.2f} s\n")
+    print(f"{'query':<18}{'matches':>9}{'index p50':>12}{'index p99':>12}{'scan':>12}")
+
+    for query in QUERIES:
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            total, _ = index.search(query, 0, 20)
+            samples.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        names.str.contains(query, case=False, na=False).sum()
+        scan = time.perf_counter() - start
+
+        print(f"{query:<18}{total:>9}"
+              f"{percentile(samples, 0.5) * 1e3:>10.2f}ms"
+              f"{percentile(samples, 0.99) * 1e3:>10.2f}ms"
+              f"{scan * 1e3:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,78 @@
+# bench_render.py
+
+"""Compare the old per-character MarkdownV2 escaping with the translate-based renderer.
+
+Also checks that both produce the same text.
+
+Usage: python bench_render.py [rows]
+"""
+
+import random
+import sys
+import time
+
+from render import (
+    escape_column,
+    escape_markdown_v2,
+    hostel_label,
+    render_name_results,
+    render_result_fragments,
+)
+from synthetic import make_students
+
+
+def per_char_escape(text):
+    escape_chars = r"\_*[]()~`>#+-=|{}.!<>"
+    return ''.join(['\\' + char if char in escape_chars else char for char in text])
+
+
+def per_row_results(students, start, total):
+    """The name search page as it was rendered before, one field at a time."""
+    header = per_char_escape(f"Results {start + 1}-{start + len(students)} of {total}")
+    parts = [f"{header}\n\n"]
+    for student in students:
+        parts.append(
+            f"Name: {per_char_escape(student.get('name', ''))}\n"
+            f"Roll No: {per_char_escape(student.get('roll', ''))}\n"
+            f"Section: {per_char_escape(student.get('section-6th', ''))}\n"
+            f"Hostel: {per_char_escape(hostel_label(student.get('hostel')))}\n\n"
+        )
+    return "".join(parts)
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def run(n):
+    df = make_students(n)
+    # Add the characters that need escaping, which the synthetic names lack
+    df.loc[::7, 'name'] = df['name'][::7] + " (A.K.A_TEST!)"
+    names = df['name'].tolist()
+
+    old, old_names = timed(lambda: [per_char_escape(name) for name in names])
+    new, new_names = timed(lambda: [escape_markdown_v2(name) for name in names])
+    column, column_names = timed(lambda: escape_column(df, 'name'))
+    assert old_names == new_names == column_names
+    print(f"{n:>9} names  | per-char {old * 1e3:8.1f} ms | translate {new * 1e3:7.1f} ms "
+          f"({old / new:4.1f}x) | whole column {column * 1e3:7.1f} ms ({old / column:4.1f}x)")
+
+    build, fragments = timed(lambda: render_result_fragments(df))
+    print(f"{'':>9}        | result fragments for every row built in {build * 1e3:.1f} ms")
+
+    # One page of name results, as get_by_name sends it
+    positions = random.Random(1).sample(range(n), 20)
+    records = [{k: v for k, v in df.iloc[p].items() if v is not None} for p in positions]
+    page_fragments = [fragments[p] for p in positions]
+    old_page, old_text = timed(lambda: per_row_results(records, 0, n), repeat=200)
+    new_page, new_text = timed(lambda: render_name_results(page_fragments, 0, n), repeat=200)
+    assert old_text == new_text
+    print(f"{'':>9} page   | per-row {old_page * 1e6:8.1f} us | fragment join {new_page * 1e6:6.1f} us "
+          f"({old_page / new_page:5.0f}x)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
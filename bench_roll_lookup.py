@@ -0,0 +1,48 @@
+# bench_roll_lookup.py
+
+"""Compare the old boolean-scan roll lookup with the StudentStore index.
+
+Usage: python bench_roll_lookup.py [rows ...]
+"""
+
+import random
+import sys
+import time
+
+from student_store import StudentStore
+from synthetic import make_students
+
+
+def scan_lookup(df, roll_number):
+    student_data = df[df['roll'] == roll_number]
+    if student_data.empty:
+        return None
+    return student_data.iloc[0].to_dict()
+
+
+def timed(fn, rolls):
+    start = time.perf_counter()
+    for roll in rolls:
+        fn(roll)
+    return (time.perf_counter() - start) / len(rolls)
+
+
+def run(n, queries=200):
+    df = make_students(n)
+    rolls = random.Random(1).sample(df['roll'].tolist(), min(queries, n))
+
+    start = time.perf_counter()
+    store = StudentStore(df)
+    build = time.perf_counter() - start
+
+    scan = timed(lambda r: scan_lookup(df, r), rolls)
+    indexed = timed(store.get, rolls)
+    print(f"{n:>9} rows | index build {build * 1e3:8.1f} ms | "
+          f"scan {scan * 1e6:10.1f} us/lookup | index {indexed * 1e6:8.1f} us/lookup | "
+          f"{scan / indexed:7.0f}x")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 1_000_000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,36 @@
+# bench_split.py
+
+"""Messages sent per section roster, with the old fixed slices and packed records.
+
+The roster of a synthetic section is split both ways: the old fixed
+3500-character slices, which can cut a record in half, and the records
+packed into as few Telegram messages as fit. The splitter's properties are
+tested in tests/test_render.py.
+
+Usage: python bench_split.py
+"""
+
+from render import MAX_MESSAGE_LENGTH, message_length, render_roster_entries, render_roster_pages
+from synthetic import make_students
+
+
+def old_split(message, chunk_size=3500):
+    return [message[i:i + chunk_size] for i in range(0, len(message), chunk_size)]
+
+
+def measure_sections():
+    df = make_students(20_000, seed=3)
+    df.loc[::7, 'name'] = df['name'][::7] + " (A.K.A_TEST!)"  # Characters that need escaping
+    entries = render_roster_entries(df)
+    print(f"{'students':>9} | {'old 3500-char slices':>21} | {'packed pages':>12} | records cut in half (old)")
+    for size in (60, 120, 250, 500, 1000):
+        roster = "\n".join(entries[:size])  # Each entry ends in a newline, so records end in a blank line
+        old = old_split(roster)
+        broken = sum(1 for chunk in old[:-1] if not chunk.endswith("\n\n"))
+        new = render_roster_pages("CSE-01, year 3", entries[:size])
+        assert all(message_length(page) <= MAX_MESSAGE_LENGTH for page in new)
+        print(f"{size:>9} | {len(old):>21} | {len(new):>12} | {broken}")
+
+
+if __name__ == "__main__":
+    measure_sections()
@@ -0,0 +1,52 @@
+# bench_startup.py
+
+"""Startup time and peak RSS of loading the student store from Excel vs the snapshot.
+
+Each measurement runs in a fresh interpreter so caches and imports don't carry over.
+
+Usage: python bench_startup.py [data.xlsx]
+"""
+
+import json
+import subprocess
+import sys
+
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import pandas as pd
+from student_store import StudentStore, read_students
+from snapshot import read_snapshot
+source, mode = sys.argv[1], sys.argv[2]
+df = read_students(source) if mode == 'excel' else read_snapshot(source)
+if df is None:
+    sys.exit('snapshot missing or stale; run python snapshot.py first')
+loaded = time.perf_counter()
+store = StudentStore(df)
+done = time.perf_counter()
+print(json.dumps({
+    'load_s': loaded - start,
+    'total_s': done - start,
+    'rows': len(store),
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def measure(source, mode):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, source, mode],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else 'data.xlsx'
+    subprocess.run([sys.executable, 'snapshot.py', source], check=True)
+
+    print(f"{'mode':<10}{'rows':>8}{'load':>10}{'startup':>10}{'max RSS':>12}")
+    for mode in ('excel', 'snapshot'):
+        result = measure(source, mode)
+        print(f"{mode:<10}{result['rows']:>8}{result['load_s']:>9.2f}s"
+              f"{result['total_s']:>9.2f}s{result['max_rss_mb']:>10.0f}MB")
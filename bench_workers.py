@@ -0,0 +1,143 @@
+# bench_workers.py
+
+"""Load-test serve.py at several worker counts.
+
+Starts the server with 1, 4 and 8 workers (or the counts given), drives
+GET /student/<roll> and GET /section/<year>/<code> with real roll numbers and
+sections from data.xlsx (the pages the forms redirect to), and reports requests per second, p50/p99 latency and the memory
+of the whole server (PSS, so pages shared between workers count once).
+
+Usage: python bench_workers.py [workers ...]
+Environment: BENCH_SECONDS (default 10), BENCH_CONCURRENCY (default 32),
+BENCH_CLIENTS (client processes, default 2)
+"""
+
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from multiprocessing import Pool
+
+import httpx
+
+from student_store import SECTION_COLUMNS, load_store, parse_section, section_code
+
+PORT = 5055
+SECONDS = float(os.environ.get('BENCH_SECONDS', 10))
+CONCURRENCY = int(os.environ.get('BENCH_CONCURRENCY', 32))
+CLIENTS = int(os.environ.get('BENCH_CLIENTS', 2))
+
+
+def request_urls():
+    """Student and section page URLs built from the real data."""
+    df = load_store().table.to_frame()
+    rolls = df['roll'].dropna().tolist()
+    sections = set()
+    for year, column in SECTION_COLUMNS.items():
+        for value in df[column].dropna().unique():
+            key = parse_section(value)
+            if key is not None:
+                sections.add((year, key[0], key[1]))
+    return {
+        '/student': [f"/student/{roll}" for roll in rolls if '/' not in roll],
+        '/section': [f"/section/{year}/{section_code(branch, number)}"
+                     for year, branch, number in sorted(sections)],
+    }
+
+
+async def _drive(urls, seconds, concurrency):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    rng = random.Random(os.getpid())
+
+    async def worker(client):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(rng.choice(urls))
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=30) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def drive(args):
+    return asyncio.run(_drive(*args))
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def server_pss_mb(pid):
+    """Proportional set size of the server and its workers, or None off Linux."""
+    total = 0
+    for process in [pid] + _children(pid):
+        try:
+            with open(f"/proc/{process}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith('Pss:'):
+                        total += int(line.split()[1])
+        except OSError:
+            return None
+    return total / 1024
+
+
+def wait_ready(timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/version", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(workers, urls):
+    server = subprocess.Popen([sys.executable, 'serve.py', str(workers), f"127.0.0.1:{PORT}"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready()
+        time.sleep(1)  # Let every worker finish booting
+        for path, path_urls in urls.items():
+            per_client = max(1, CONCURRENCY // CLIENTS)
+            with Pool(CLIENTS) as pool:
+                results = pool.map(drive, [(path_urls, SECONDS, per_client)] * CLIENTS)
+            latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+            errors = sum(client_errors for _, client_errors in results)
+            memory = server_pss_mb(server.pid)  # After the load, so copy-on-write copies are counted
+            memory_text = f"{memory:7.1f} MB" if memory is not None else "      n/a"
+            print(f"{workers:>3} workers | {path:<8} | {len(latencies) / SECONDS:8.0f} req/s | "
+                  f"p50 {percentile(latencies, 0.5) * 1e3:7.1f} ms | "
+                  f"p99 {percentile(latencies, 0.99) * 1e3:7.1f} ms | "
+                  f"{errors} errors | server PSS {memory_text}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1, 4, 8]
+    urls = request_urls()
+    for count in counts:
+        run(count, urls)
@@ -0,0 +1,318 @@
+# broadcast.py
+
+"""Background broadcast of announcements to every known user.
+
+Messages go out through a fixed pool of worker tasks, paced by a token bucket
+shared by every broadcast in the process, so together they stay under
+Telegram's global limit, and a minimum gap per chat. Flood
+waits (RetryAfter) pause the whole pool and put the user back in the queue;
+timeouts and network errors are retried with backoff. Every delivery is
+recorded in SQLite, off the event loop, so a broadcast interrupted by a
+restart resumes with the users it had not reached yet.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+from executor import run_blocking
+
+BROADCAST_DB = 'broadcast.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id                INTEGER PRIMARY KEY,
+    text              TEXT NOT NULL,
+    admin_chat_id     INTEGER NOT NULL,
+    status_message_id INTEGER,
+    created           REAL NOT NULL,
+    finished          REAL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    broadcast_id INTEGER NOT NULL,
+    chat_id      INTEGER NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    error        TEXT,
+    PRIMARY KEY (broadcast_id, chat_id)
+);
+"""
+
+# Telegram allows about 30 messages per second overall and one per second per chat
+GLOBAL_RATE = 25
+# Sends the bucket lets through at once; a full second's worth on top of the
+# rate would go over the global limit when a broadcast starts
+BURST = 3
+PER_CHAT_INTERVAL = 1.0
+CONCURRENCY = 20
+MAX_RETRIES = 5
+PROGRESS_INTERVAL = 5.0
+
+
+class BroadcastStore:
+    """Persistent record of broadcasts and of each delivery's outcome."""
+
+    def __init__(self, path=BROADCAST_DB):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # Calls come from executor threads; one connection, used by one at a time
+        self._lock = threading.Lock()
+
+    def create(self, text, admin_chat_id, chat_ids):
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO broadcasts (text, admin_chat_id, created) VALUES (?, ?, ?)",
+                (text, admin_chat_id, time.time()),
+            )
+            broadcast_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO deliveries (broadcast_id, chat_id) VALUES (?, ?)",
+                [(broadcast_id, int(chat_id)) for chat_id in chat_ids],
+            )
+        return broadcast_id
+
+    def get(self, broadcast_id):
+        """Return (text, admin_chat_id, status_message_id) for a broadcast."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT text, admin_chat_id, status_message_id FROM broadcasts WHERE id = ?",
+                (broadcast_id,),
+            ).fetchone()
+
+    def set_status_message(self, broadcast_id, message_id):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE broadcasts SET status_message_id = ? WHERE id = ?",
+                (message_id, broadcast_id),
+            )
+
+    def pending(self, broadcast_id):
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT chat_id FROM deliveries WHERE broadcast_id = ? AND status = 'pending'",
+                (broadcast_id,),
+            )]
+
+    def record(self, broadcast_id, results):
+        """Store a batch of (chat_id, status, error) outcomes."""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE deliveries SET status = ?, error = ? WHERE broadcast_id = ? AND chat_id = ?",
+                [(status, error, broadcast_id, chat_id) for chat_id, status, error in results],
+            )
+
+    def counts(self, broadcast_id):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) FROM deliveries WHERE broadcast_id = ? GROUP BY status",
+                (broadcast_id,),
+            ).fetchall()
+        counts = {'pending': 0, 'sent': 0, 'failed': 0}
+        counts.update(dict(rows))
+        return counts
+
+    def finish(self, broadcast_id):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE broadcasts SET finished = ? WHERE id = ?", (time.time(), broadcast_id))
+
+    def unfinished(self):
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT id FROM broadcasts WHERE finished IS NULL ORDER BY id")]
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """Hand out no tokens for `seconds`, e.g. after a flood wait."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+_shared_bucket = None
+
+
+def shared_bucket():
+    """The process-wide bucket, so broadcasts running side by side share GLOBAL_RATE."""
+    global _shared_bucket
+    if _shared_bucket is None:
+        _shared_bucket = TokenBucket(GLOBAL_RATE, BURST)
+    return _shared_bucket
+
+
+class Broadcaster:
+    """Sends one broadcast's pending deliveries and records the outcomes."""
+
+    def __init__(self, bot, store, concurrency=CONCURRENCY, bucket=None,
+                 per_chat_interval=PER_CHAT_INTERVAL, max_retries=MAX_RETRIES,
+                 progress_interval=PROGRESS_INTERVAL):
+        self.bot = bot
+        self.store = store
+        self.concurrency = concurrency
+        self.bucket = bucket or shared_bucket()
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self.progress_interval = progress_interval
+        self._last_sent = {}
+
+    async def _wait_for_chat(self, chat_id):
+        last = self._last_sent.get(chat_id)
+        if last is not None:
+            delay = last + self.per_chat_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self._last_sent[chat_id] = time.monotonic()
+
+    async def _send(self, chat_id, text):
+        """
+        Deliver to one chat. Returns ('sent', None), ('failed', reason), or
+        ('pending', None) after a flood wait, to be tried again later.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            await self._wait_for_chat(chat_id)
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text)
+                return 'sent', None
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                seconds = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else retry_after
+                logging.warning(f"Flood limit hit, pausing broadcast for {seconds}s")
+                self.bucket.pause(seconds)
+                return 'pending', None
+            except (Forbidden, BadRequest) as e:
+                # Blocked the bot, deleted account or unknown chat: retrying will not help
+                return 'failed', str(e)
+            except (TimedOut, NetworkError) as e:
+                if attempt == self.max_retries:
+                    return 'failed', str(e)
+                await asyncio.sleep(min(2 ** attempt, 30))
+            except Exception as e:
+                return 'failed', str(e)
+
+    async def run(self, broadcast_id, on_progress=None):
+        """
+        Send every pending delivery of `broadcast_id`.
+
+        `on_progress(counts, done)` is awaited every few seconds and once at the
+        end with the counts of sent, failed and pending deliveries.
+        """
+        text = (await run_blocking("broadcast get", self.store.get, broadcast_id))[0]
+        queue = asyncio.Queue()
+        for chat_id in await run_blocking("broadcast pending", self.store.pending, broadcast_id):
+            queue.put_nowait(chat_id)
+
+        results = []
+
+        async def worker():
+            while True:
+                try:
+                    chat_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                status, error = await self._send(chat_id, text)
+                if status == 'pending':
+                    queue.put_nowait(chat_id)  # Flood waits are not the user's fault; try again after the pause
+                    continue
+                if error:
+                    logging.error(f"Could not send message to {chat_id}: {error}")
+                results.append((chat_id, status, error))
+
+        async def flush():
+            if results:
+                batch = results[:]
+                del results[:len(batch)]
+                await run_blocking("broadcast record", self.store.record, broadcast_id, batch)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            while not all(task.done() for task in workers):
+                await asyncio.wait(workers, timeout=self.progress_interval)
+                await flush()
+                if on_progress is not None:
+                    counts = await run_blocking("broadcast counts", self.store.counts, broadcast_id)
+                    await on_progress(counts, False)
+        finally:
+            for task in workers:
+                task.cancel()
+            await flush()
+
+        await run_blocking("broadcast finish", self.store.finish, broadcast_id)
+        counts = await run_blocking("broadcast counts", self.store.counts, broadcast_id)
+        if on_progress is not None:
+            await on_progress(counts, True)
+        return counts
+
+
+def progress_text(counts, done):
+    total = sum(counts.values())
+    if done:
+        message = f"Announcement sent successfully to {counts['sent']} user(s)."
+        if counts['failed'] > 0:
+            message += f" {counts['failed']} user(s) could not be contacted."
+        return message
+    return f"Announcing… {counts['sent'] + counts['failed']}/{total} done, {counts['failed']} failed."
+
+
+async def run_broadcast(bot, store, broadcast_id):
+    """Run a stored broadcast, keeping the admin's status message up to date."""
+    _, admin_chat_id, status_message_id = await run_blocking("broadcast get", store.get, broadcast_id)
+
+    async def report(counts, done):
+        try:
+            await bot.edit_message_text(
+                chat_id=admin_chat_id, message_id=status_message_id, text=progress_text(counts, done))
+        except Exception as e:
+            # "Message is not modified" and similar are harmless for a status line
+            logging.debug(f"Could not update broadcast progress: {e}")
+
+    try:
+        await Broadcaster(bot, store).run(broadcast_id, report)
+    except Exception as e:
+        logging.error(f"Broadcast {broadcast_id} stopped: {e}")
+
+
+async def start_broadcast(application, store, text, admin_chat_id, chat_ids):
+    """Record a broadcast and run it as a background task. Returns its id."""
+    broadcast_id = await run_blocking("broadcast create", store.create, text, admin_chat_id, chat_ids)
+    status = await application.bot.send_message(
+        chat_id=admin_chat_id, text=f"Announcement queued for {len(chat_ids)} user(s).")
+    await run_blocking("broadcast status", store.set_status_message, broadcast_id, status.message_id)
+    application.create_task(run_broadcast(application.bot, store, broadcast_id))
+    return broadcast_id
+
+
+async def resume_broadcasts(application, store):
+    """Restart broadcasts that were interrupted before they finished."""
+    for broadcast_id in await run_blocking("broadcast unfinished", store.unfinished):
+        logging.info(f"Resuming broadcast {broadcast_id}")
+        application.create_task(run_broadcast(application.bot, store, broadcast_id))
@@ -0,0 +1,79 @@
+# build_static.py
+
+"""Pre-render every section page into a directory a reverse proxy can serve.
+
+Each page is written to <out>/section/<year>/<CODE>/index.html, next to its
+.gz and .br encodings, at the same path as the app's GET /section/<year>/<CODE>
+route. The proxy then answers those pages from disk and passes everything
+else to the app. With nginx (brotli_static needs the ngx_brotli module):
+
+    location /section/ {
+        root /srv/finder/site;
+        gzip_static on;
+        brotli_static on;
+        try_files $uri/index.html @app;
+    }
+
+Run it again after data.xlsx changes; the pages are written to a new
+directory that replaces the old one, so the proxy never serves a half-built
+site.
+
+Usage: python build_static.py [output directory, default: site]
+"""
+
+import os
+import shutil
+import sys
+import time
+
+from app import app, data, render_section_page, render_template
+from page_cache import compress
+
+ENCODING_SUFFIXES = {'': '', 'gzip': '.gz', 'br': '.br'}
+
+
+def write_page(directory, html):
+    """Write `html` and its encodings, compressed as hard as they go; returns them."""
+    bodies = compress(html, brotli_quality=11)
+    os.makedirs(directory, exist_ok=True)
+    for encoding, body in bodies.items():
+        with open(os.path.join(directory, 'index.html' + ENCODING_SUFFIXES[encoding]), 'wb') as f:
+            f.write(body)
+    return bodies
+
+
+def build(out='site'):
+    start = time.perf_counter()
+    staging = out.rstrip(os.sep) + '.new'
+    shutil.rmtree(staging, ignore_errors=True)
+
+    store = data.current
+    count = 0
+    size = {encoding: 0 for encoding in ENCODING_SUFFIXES}
+    with app.test_request_context():
+        write_page(staging, render_template('index.html').encode('utf-8'))
+        for year, code, _ in store.sections():
+            page = render_section_page(store, year, code)
+            bodies = write_page(os.path.join(staging, 'section', year, code), page.bodies[''])
+            count += 1
+            for encoding, body in bodies.items():
+                size[encoding] += len(body)
+
+    # Swap the finished site in
+    if os.path.exists(out):
+        old = out.rstrip(os.sep) + '.old'
+        shutil.rmtree(old, ignore_errors=True)
+        os.rename(out, old)
+        os.rename(staging, out)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.rename(staging, out)
+
+    print(f"Wrote {count} section pages for data version {store.version} to {out}/ "
+          f"in {time.perf_counter() - start:.2f}s")
+    print("Total bytes: " + ", ".join(f"{encoding or 'html'} {total / 1024:.0f} KiB"
+                                      for encoding, total in size.items() if total))
+
+
+if __name__ == "__main__":
+    build(sys.argv[1] if len(sys.argv) > 1 else 'site')
@@ -0,0 +1,277 @@
+# columnar.py
+
+"""Compact column store for the student table.
+
+A DataFrame of object columns keeps a separate Python string for every cell.
+StudentTable keeps each column in the cheapest form that gives the same
+values back:
+
+- low-cardinality columns (sections, hostel, electives) as categorical
+  codes in the smallest integer type, plus one list of distinct values
+- roll numbers as int64, with a sorted copy for binary-search lookups;
+  the odd roll that isn't a plain number is kept as text on the side
+- columns that are the roll number plus a fixed suffix (the KIIT email) as
+  that suffix and a presence mask
+- every other column as a list of interned strings, with None for blanks
+
+Rows come back as dicts and columns as object arrays, so the renderers and
+indices built from a DataFrame can be built from a StudentTable too.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Always categorical, whatever their cardinality
+CATEGORICAL_COLUMNS = ('hostel', 'sec2nd', 'section-6th', 'section-5th', 'eduskill', '4thsemelective')
+
+# Other columns become categorical when they have at most this many distinct
+# values, or one per this many rows if that's more
+MAX_CATEGORIES = 255
+ROWS_PER_CATEGORY = 20
+
+ROLL_COLUMN = 'roll'
+
+# Hostel kinds, from the hostel's prefix
+DAY_SCHOLAR, BOYS_HOSTEL, GIRLS_HOSTEL = 0, 1, 2
+
+
+def _code_dtype(count):
+    for dtype in (np.int8, np.int16, np.int32):
+        if count < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _plain_number(roll):
+    """True for a roll that int() gives back exactly: ASCII digits, no leading zero."""
+    return roll.isascii() and roll.isdigit() and roll[0] != '0' and len(roll) < 19
+
+
+def _cell(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Categorical:
+    """Codes into a list of distinct values; code -1 is a blank cell."""
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        self.categories = [_cell(value) for value in uniques.tolist()]
+        self.codes = codes.astype(_code_dtype(len(self.categories)))
+        # The categories with None appended, so code -1 indexes None
+        self._lookup = np.array(self.categories + [None], dtype=object)
+
+    def __getitem__(self, position):
+        return self._lookup[self.codes[position]]
+
+    def to_array(self):
+        return self._lookup[self.codes]
+
+    def nbytes(self):
+        return self.codes.nbytes + self._lookup.nbytes + sum(map(sys.getsizeof, self.categories))
+
+
+class Text:
+    """Interned strings, None for a blank cell."""
+
+    def __init__(self, values):
+        self.values = [_cell(value) for value in values]
+
+    def __getitem__(self, position):
+        return self.values[position]
+
+    def to_array(self):
+        return np.array(self.values, dtype=object)
+
+    def nbytes(self):
+        # Each distinct string once, as interning shares the repeats
+        strings = {id(value): value for value in self.values if value is not None}
+        return sys.getsizeof(self.values) + sum(map(sys.getsizeof, strings.values()))
+
+
+class Rolls:
+    """Roll numbers as int64, searchable through a sorted copy."""
+
+    def __init__(self, values):
+        n = len(values)
+        self.numbers = np.full(n, -1, dtype=np.int64)
+        self.irregular = {}  # position -> roll that isn't a plain number (leading zero, letters)
+        for position, roll in enumerate(values):
+            if roll is None:
+                continue
+            if _plain_number(roll):
+                self.numbers[position] = int(roll)
+            else:
+                self.irregular[position] = roll
+
+        # A stable sort keeps the first row of a duplicated roll first, as the old lookup did
+        self._order = np.argsort(self.numbers, kind='stable').astype(_code_dtype(n))
+        self._sorted = self.numbers[self._order]
+        self._irregular_index = {}
+        for position, roll in self.irregular.items():
+            self._irregular_index.setdefault(roll, position)
+
+    def __getitem__(self, position):
+        number = self.numbers[position]
+        if number >= 0:
+            return str(number)
+        return self.irregular.get(position)
+
+    def find(self, roll):
+        """Position of the first row with this roll number, or None."""
+        if not isinstance(roll, str):
+            return None
+        if not _plain_number(roll):
+            return self._irregular_index.get(roll)
+        number = int(roll)
+        index = int(np.searchsorted(self._sorted, number))
+        if index < len(self._sorted) and self._sorted[index] == number:
+            return int(self._order[index])
+        return None
+
+    def to_array(self):
+        return np.array([self[position] for position in range(len(self.numbers))], dtype=object)
+
+    def nbytes(self):
+        return (self.numbers.nbytes + self._order.nbytes + self._sorted.nbytes
+                + sum(sys.getsizeof(roll) for roll in self.irregular.values()))
+
+
+class RollSuffix:
+    """
+    A column that is the roll number plus a fixed suffix, e.g. "@kiit.ac.in".
+    The few values that don't fit (a row without a roll number) are kept as they are.
+    """
+
+    # Give up on the pattern when more than one value in this many doesn't fit
+    MAX_EXCEPTION_RATE = 100
+
+    def __init__(self, rolls, suffix, present, exceptions):
+        self.rolls = rolls
+        self.suffix = suffix
+        self.present = present
+        self.exceptions = exceptions  # position -> value
+
+    @classmethod
+    def detect(cls, rolls, values):
+        """A RollSuffix for `values` if nearly every non-blank one fits the pattern, else None."""
+        suffix = None
+        present = np.zeros(len(values), dtype=bool)
+        exceptions = {}
+        limit = len(values) // cls.MAX_EXCEPTION_RATE
+        for position, value in enumerate(values):
+            if value is None:
+                continue
+            roll = rolls[position]
+            if isinstance(value, str) and roll is not None and value.startswith(roll):
+                if suffix is None:
+                    suffix = value[len(roll):]
+                if value[len(roll):] == suffix:
+                    present[position] = True
+                    continue
+            exceptions[position] = value
+            if len(exceptions) > limit:
+                return None
+        if not suffix:
+            return None
+        return cls(rolls, suffix, present, exceptions)
+
+    def __getitem__(self, position):
+        if self.present[position]:
+            return self.rolls[position] + self.suffix
+        return self.exceptions.get(position)
+
+    def to_array(self):
+        return np.array([self[position] for position in range(len(self.present))], dtype=object)
+
+    def nbytes(self):
+        return (self.present.nbytes + sys.getsizeof(self.suffix)
+                + sum(sys.getsizeof(value) for value in self.exceptions.values()))
+
+
+def _cells(series):
+    """A column's values as Python objects, with None for every kind of blank."""
+    values = series.tolist()
+    for position in np.flatnonzero(series.isna().to_numpy()):
+        values[position] = None
+    return values
+
+
+class StudentTable:
+    """The student table in compact columns; see the module docstring."""
+
+    def __init__(self, df: pd.DataFrame):
+        df = df.reset_index(drop=True)
+        self.columns = list(df.columns)
+        self._length = len(df)
+        self._columns = {}
+
+        rolls = None
+        if ROLL_COLUMN in df.columns:
+            rolls = Rolls([roll if isinstance(roll, str) else None for roll in _cells(df[ROLL_COLUMN])])
+
+        limit = max(MAX_CATEGORIES, self._length // ROWS_PER_CATEGORY)
+        for column in self.columns:  # In the DataFrame's order, which rows keep
+            if column == ROLL_COLUMN:
+                self._columns[column] = rolls
+                continue
+            values = _cells(df[column])
+            if column in CATEGORICAL_COLUMNS or df[column].nunique() <= limit:
+                self._columns[column] = Categorical(values)
+                continue
+            derived = RollSuffix.detect(rolls, values) if rolls is not None else None
+            self._columns[column] = derived or Text(values)
+
+        self.hostel_kinds = self._hostel_kinds()
+
+    def _hostel_kinds(self):
+        """DAY_SCHOLAR, BOYS_HOSTEL or GIRLS_HOSTEL for every row, by hostel prefix."""
+        hostel = self._columns.get('hostel')
+        if not isinstance(hostel, Categorical):
+            return np.zeros(self._length, dtype=np.int8)
+        kinds = np.array([
+            BOYS_HOSTEL if isinstance(value, str) and value.startswith('KP')
+            else GIRLS_HOSTEL if isinstance(value, str) and value.startswith('QC')
+            else DAY_SCHOLAR
+            for value in hostel.categories
+        ] + [DAY_SCHOLAR], dtype=np.int8)
+        return kinds[hostel.codes]
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, column):
+        """The whole column as an object array (blank cells are None)."""
+        return self._columns[column].to_array()
+
+    def categorical(self, column):
+        """The Categorical for `column`, or None if it isn't stored as one."""
+        stored = self._columns.get(column)
+        return stored if isinstance(stored, Categorical) else None
+
+    def value(self, column, position):
+        return self._columns[column][position]
+
+    def row(self, position):
+        """The row at `position` as a dict without the blank fields."""
+        row = {}
+        for column, stored in self._columns.items():
+            value = stored[position]
+            if value is not None:
+                row[column] = value
+        return row
+
+    def find_roll(self, roll):
+        rolls = self._columns.get(ROLL_COLUMN)
+        return rolls.find(roll) if rolls is not None else None
+
+    def to_frame(self):
+        return pd.DataFrame({column: self[column] for column in self.columns})
+
+    def memory_usage(self):
+        """Bytes held per column, counting each distinct string once."""
+        usage = {column: stored.nbytes() for column, stored in self._columns.items()}
+        usage['(hostel kinds)'] = self.hostel_kinds.nbytes
+        return usage
@@ -0,0 +1,302 @@
+# command_log.py
+
+"""Append-only log of user queries, stored in SQLite (WAL mode).
+
+Handlers only put events on a bounded queue; a background thread writes them
+in batches, so logging never touches the disk on the bot's event loop.
+
+`events` holds one row per query, indexed by user and by time. `users` holds
+one row per user and is what announcements read. The old Excel logs are
+imported once by migrate_legacy_logs (or `python command_log.py`).
+"""
+
+import atexit
+import logging
+import os
+import re
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytz
+
+COMMAND_LOG_DB = 'user_log.db'
+
+IST = pytz.timezone('Asia/Kolkata')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id       INTEGER PRIMARY KEY,
+    user_id  INTEGER NOT NULL,
+    username TEXT,
+    query    TEXT NOT NULL,
+    ts       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_user_ts ON events (user_id, ts);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE TABLE IF NOT EXISTS users (
+    user_id    INTEGER PRIMARY KEY,
+    username   TEXT,
+    first_seen TEXT,
+    last_seen  TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Fills `users` for databases written before that table existed
+BACKFILL_USERS = """
+INSERT OR IGNORE INTO users (user_id, username, first_seen, last_seen)
+SELECT e.user_id, e.username, s.first_seen, s.last_seen
+FROM (SELECT user_id, MAX(id) AS last_id, MIN(ts) AS first_seen, MAX(ts) AS last_seen
+      FROM events GROUP BY user_id) AS s
+JOIN events AS e ON e.id = s.last_id
+"""
+
+UPSERT_USER = """
+INSERT INTO users (user_id, username, first_seen, last_seen) VALUES (?, ?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET
+    username = excluded.username,
+    last_seen = excluded.last_seen
+"""
+
+# One entry of a legacy "Commands" cell: "query" or "query [YYYY-MM-DD HH:MM:SS]"
+LEGACY_ENTRY = re.compile(r'^(.*?)(?: \[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\])?$', re.S)
+
+_STOP = object()
+
+
+def connect(path=COMMAND_LOG_DB):
+    """Open the log database."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def init_db(path=COMMAND_LOG_DB):
+    """Create the schema, and the users table for older databases."""
+    conn = connect(path)
+    try:
+        with conn:
+            conn.executescript(SCHEMA)
+            if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM users)").fetchone()[0]:
+                conn.execute(BACKFILL_USERS)
+    finally:
+        conn.close()
+
+
+class CommandLog:
+    """Batched writer and reader for the command log."""
+
+    def __init__(self, path=COMMAND_LOG_DB, max_queue=10000, batch_size=500, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        if not self._initialized:
+            init_db(self.path)
+            self._initialized = True
+        return connect(self.path)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._connect().close()  # Make sure the schema exists before readers need it
+            self._thread = threading.Thread(target=self._run, name="command-log", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def log(self, user_id, username, query):
+        """Queue one event. Never blocks; drops the event if the queue is full."""
+        if self._thread is None:
+            self.start()
+
+        timestamp = datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            self._queue.put_nowait((user_id, username, query, timestamp))
+        except queue.Full:
+            self.dropped += 1
+            logging.error(f"Command log queue full, dropped query from {username}")
+
+    def close(self):
+        """Flush everything still queued and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join()
+
+    def _run(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(conn, batch)
+        conn.close()
+
+    def _write(self, conn, batch):
+        start = time.perf_counter()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO events (user_id, username, query, ts) VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+                conn.executemany(
+                    UPSERT_USER,
+                    [(user_id, username, ts, ts) for user_id, username, _, ts in batch],
+                )
+            logging.debug(f"command log flush of {len(batch)} events took "
+                          f"{(time.perf_counter() - start) * 1e3:.1f} ms")
+        except Exception as e:
+            logging.error(f"Failed to write {len(batch)} command log events: {e}")
+
+    # Readers use their own connection; WAL lets them run alongside the writer
+
+    def _read(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def user_ids(self):
+        """Return the set of user IDs that have used the bot."""
+        return {row[0] for row in self._read("SELECT user_id FROM users")}
+
+    def users(self):
+        """Return (user_id, latest username) for every logged user."""
+        return self._read("SELECT user_id, username FROM users ORDER BY user_id")
+
+    def iter_events(self, start=None, end=None, user=None, batch_size=1000):
+        """
+        Yield (user_id, username, query, timestamp) rows, oldest first.
+
+        `start` and `end` are inclusive "YYYY-MM-DD" dates, `user` is a user ID
+        or username. Rows are fetched in batches, so memory use stays flat.
+        """
+        conditions, params = [], []
+        if start:
+            conditions.append("ts >= ?")
+            params.append(start)
+        if end:
+            conditions.append("ts < date(?, '+1 day')")
+            params.append(end)
+        if user:
+            if str(user).isdigit():
+                conditions.append("user_id = ?")
+                params.append(int(user))
+            else:
+                conditions.append("username = ?")
+                params.append(str(user).lstrip('@'))
+
+        sql = "SELECT user_id, username, query, ts FROM events"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id"
+
+        conn = self._connect()
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def migrate_legacy_logs(self, log_file='user_log.xlsx', commands_file='user_commands.xlsx'):
+        """
+        Import the old Excel logs once.
+
+        Each comma-joined "Commands" cell of `log_file` becomes one event per
+        query; entries logged before timestamps were added get an empty
+        timestamp. User IDs from `commands_file` are added to `users`.
+        Returns the number of events imported, or None if this already ran.
+        """
+        conn = self._connect()
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+                return None
+
+            events, users, seen = [], {}, {}
+            if os.path.exists(log_file):
+                for _, row in pd.read_excel(log_file).iterrows():
+                    if pd.isna(row.get('User ID')):
+                        continue
+                    user_id = int(row['User ID'])
+                    username = None if pd.isna(row.get('Username')) else str(row['Username'])
+                    users[user_id] = username
+
+                    commands = row.get('Commands')
+                    if pd.isna(commands):
+                        continue
+                    for entry in str(commands).split(', '):
+                        query, timestamp = LEGACY_ENTRY.match(entry).groups()
+                        events.append((user_id, username, query, timestamp or ''))
+                        if timestamp:
+                            first, last = seen.get(user_id, (timestamp, timestamp))
+                            seen[user_id] = (min(first, timestamp), max(last, timestamp))
+
+            if os.path.exists(commands_file):
+                for user_id in pd.read_excel(commands_file)['User ID'].dropna():
+                    users.setdefault(int(user_id), None)
+
+            with conn:
+                conn.executemany(
+                    "INSERT INTO events (user_id, username, query, ts) VALUES (?, ?, ?, ?)",
+                    events,
+                )
+                # Users already logged by the bot keep their newer username and last_seen
+                conn.executemany(
+                    "INSERT INTO users (user_id, username, first_seen, last_seen) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (user_id) DO UPDATE SET"
+                    " username = COALESCE(users.username, excluded.username),"
+                    " first_seen = COALESCE(excluded.first_seen, users.first_seen)",
+                    [(user_id, username) + seen.get(user_id, (None, None))
+                     for user_id, username in users.items()],
+                )
+                conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_migrated', ?)",
+                             (datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S'),))
+            logging.info(f"Imported {len(events)} legacy commands for {len(users)} users")
+            return len(events)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    imported = CommandLog().migrate_legacy_logs()
+    print("Legacy logs were already imported." if imported is None else f"Imported {imported} commands.")
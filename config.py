@@ -0,0 +1,66 @@
+# config.py
+
+"""Runtime settings, read from the environment with the defaults used so far."""
+
+import os
+import sys
+
+
+def _int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def require_bot_token():
+    """Exit with a clear message when the bot is started without BOT_TOKEN."""
+    if not BOT_TOKEN:
+        sys.exit("BOT_TOKEN is not set; export the token from @BotFather before starting the bot")
+
+
+# Bot API endpoint and token; point BOT_API_URL at fake_bot_api.py to run offline
+BOT_TOKEN = os.environ.get('BOT_TOKEN', '')  # kripiya apna apna Token dale, BOT_TOKEN=... in the environment
+BOT_API_URL = os.environ.get('BOT_API_URL', 'https://api.telegram.org/bot')
+BOT_FILE_URL = os.environ.get('BOT_FILE_URL', 'https://api.telegram.org/file/bot')
+
+# Threads that run blocking pandas, openpyxl and SQLite work off the event loop
+BLOCKING_WORKERS = _int('BLOCKING_WORKERS', 4)
+
+# Updates the bot handles at the same time; independent chats don't wait on each other
+CONCURRENT_UPDATES = _int('CONCURRENT_UPDATES', 32)
+
+# Per-user query limits (rate_limit.py); admins can change them with /limits
+USER_RATE = _float('USER_RATE', 0.5)  # Queries per second, sustained
+USER_BURST = _int('USER_BURST', 5)  # Queries allowed back to back
+MAX_CONCURRENT_QUERIES = _int('MAX_CONCURRENT_QUERIES', 16)  # Across all users
+BUTTON_WINDOW = _float('BUTTON_WINDOW', 2.0)  # Seconds in which a repeated button press is ignored
+
+# Webhook mode (webhook.py) is used when WEBHOOK_URL is set, e.g. https://bot.example.edu;
+# otherwise the bot long-polls
+WEBHOOK_URL = os.environ.get('WEBHOOK_URL', '').rstrip('/')
+WEBHOOK_PATH = os.environ.get('WEBHOOK_PATH', '/telegram')
+# Telegram sends this in X-Telegram-Bot-Api-Secret-Token; a random one is used per start if unset
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET', '')
+WEBHOOK_LISTEN = os.environ.get('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = _int('WEBHOOK_PORT', 8000)
+# Simultaneous HTTPS connections Telegram opens to deliver updates (1-100)
+WEBHOOK_MAX_CONNECTIONS = _int('WEBHOOK_MAX_CONNECTIONS', 40)
+# Set to 0 when testing locally, so Telegram's webhook is left as it is
+WEBHOOK_REGISTER = _int('WEBHOOK_REGISTER', 1)
+
+# Threads serving the Flask web UI when it runs inside the webhook server
+WEB_THREADS = _int('WEB_THREADS', 16)
+
+# serve.py: preforked web workers sharing the data loaded by the parent
+WEB_BIND = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+WEB_WORKERS = _int('WEB_WORKERS', os.cpu_count() or 1)
+
+# How long browsers and proxies may use a cached section or student page before revalidating
+PAGE_MAX_AGE = _int('PAGE_MAX_AGE', 60)
+
+# Polling mode: set a port (e.g. 9100) for the bot to serve its own /metrics, which the
+# web UI's /metrics can't see. Off by default; in webhook mode the web UI's covers both.
+METRICS_LISTEN = os.environ.get('METRICS_LISTEN', '127.0.0.1')
+METRICS_PORT = _int('METRICS_PORT', 0)
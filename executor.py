@@ -0,0 +1,32 @@
+# executor.py
+
+"""Thread pool for blocking work called from the bot's async handlers.
+
+Anything that walks a large table, reads or writes Excel, or queries SQLite
+goes through run_blocking so one slow operation doesn't stall every chat.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import BLOCKING_WORKERS
+
+_pool = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+
+
+async def run_blocking(name, fn, *args, **kwargs):
+    """Run `fn(*args, **kwargs)` on the pool and log how long it took as `name`."""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_pool, functools.partial(fn, *args, **kwargs))
+    finally:
+        logging.info(f"{name} took {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+
+def shutdown():
+    """Wait for queued blocking work to finish."""
+    _pool.shutdown(wait=True)
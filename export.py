@@ -0,0 +1,171 @@
+# export.py
+
+"""Streaming export of the command log for the /users command.
+
+Rows go straight from SQLite into a write-only openpyxl workbook or a gzipped
+CSV on disk, so memory use doesn't grow with the log. Exports that would pass
+Telegram's 50 MB upload limit are split into several files. No timestamps go
+into the files, so the same rows give the same bytes and a recurring export
+can reuse the file_id media_cache.py kept for it.
+"""
+
+import csv
+import datetime
+import gzip
+import io
+import os
+import re
+import shutil
+import tempfile
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+from openpyxl import Workbook
+from openpyxl.writer.excel import ExcelWriter
+
+EXPORT_HEADER = ['User ID', 'Username', 'Query', 'Timestamp']
+
+# Stay under Telegram's 50 MB limit for documents sent by bots
+MAX_PART_BYTES = 45 * 1024 * 1024
+
+# A write-only workbook's size is only known once saved. Each part is cut once the
+# text of its cells, plus this much XML per cell, reaches MAX_PART_BYTES; the zip
+# compression then keeps the file well under the limit
+XLSX_CELL_OVERHEAD = 32
+XLSX_ROWS_PER_PART = 500_000
+
+# Stamped into every workbook instead of the current time, so the same rows give the same file
+XLSX_TIMESTAMP = datetime.datetime(2000, 1, 1)
+_ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+
+# How often the size of a CSV part is checked
+CSV_SIZE_CHECK_ROWS = 10_000
+
+EXPORT_FORMATS = ('xlsx', 'csv')
+
+_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+class ExportError(ValueError):
+    """Raised for /users arguments that can't be understood."""
+
+
+def parse_export_args(args):
+    """
+    Parse /users arguments: from=YYYY-MM-DD to=YYYY-MM-DD user=<id or @name> format=xlsx|csv
+
+    Returns a dict with the keys start, end, user and format.
+    """
+    options = {'start': None, 'end': None, 'user': None, 'format': 'xlsx'}
+    keys = {'from': 'start', 'to': 'end', 'user': 'user', 'format': 'format'}
+
+    for arg in args:
+        key, sep, value = arg.partition('=')
+        if not sep and arg.lower() in EXPORT_FORMATS:
+            key, value = 'format', arg
+        if key.lower() not in keys or not value:
+            raise ExportError(f"Unknown argument: {arg}")
+        options[keys[key.lower()]] = value
+
+    options['format'] = options['format'].lower()
+    if options['format'] not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown format: {options['format']}")
+    for key in ('start', 'end'):
+        if options[key] and not _DATE.match(options[key]):
+            raise ExportError(f"Dates must look like 2024-01-31, got {options[key]}")
+    return options
+
+
+def _new_part(directory, fmt, number):
+    return os.path.join(directory, f"user_log_{number}.{'csv.gz' if fmt == 'csv' else 'xlsx'}")
+
+
+class _FixedTimeZipFile(ZipFile):
+    """A ZipFile that stamps every entry with the same date instead of the current time."""
+
+    def writestr(self, zinfo_or_arcname, data, *args, **kwargs):
+        if not isinstance(zinfo_or_arcname, ZipInfo):
+            zinfo_or_arcname = ZipInfo(zinfo_or_arcname, date_time=_ZIP_TIMESTAMP)
+            zinfo_or_arcname.compress_type = self.compression
+        super().writestr(zinfo_or_arcname, data, *args, **kwargs)
+
+    def write(self, filename, arcname=None, *args, **kwargs):
+        zinfo = ZipInfo.from_file(filename, arcname)
+        zinfo.date_time = _ZIP_TIMESTAMP
+        zinfo.compress_type = self.compression
+        with open(filename, 'rb') as source, self.open(zinfo, 'w', force_zip64=True) as target:
+            shutil.copyfileobj(source, target, 1 << 20)
+
+
+def _save_workbook(workbook, path):
+    """Save like Workbook.save, minus the timestamps, so the same rows give the same bytes."""
+    workbook.properties.created = workbook.properties.modified = XLSX_TIMESTAMP
+    ExcelWriter(workbook, _FixedTimeZipFile(path, 'w', ZIP_DEFLATED, allowZip64=True)).save()
+
+
+def _write_xlsx(rows, directory):
+    parts = []
+    workbook = sheet = None
+    count = size = 0
+
+    for row in rows:
+        if sheet is None or count >= XLSX_ROWS_PER_PART or size >= MAX_PART_BYTES:
+            if workbook is not None:
+                _save_workbook(workbook, parts[-1])
+            parts.append(_new_part(directory, 'xlsx', len(parts) + 1))
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet('User Logs')
+            sheet.append(EXPORT_HEADER)
+            count = size = 0
+        row = list(row)
+        sheet.append(row)
+        count += 1
+        # Queries can be up to 4096 characters, so count bytes, not just rows
+        size += sum(len(str(cell).encode()) + XLSX_CELL_OVERHEAD for cell in row)
+
+    if workbook is not None:
+        _save_workbook(workbook, parts[-1])
+    return parts
+
+
+def _write_csv(rows, directory):
+    parts = []
+    raw = gz = text = writer = None
+    count = 0
+
+    def close():
+        text.flush()
+        text.detach()
+        gz.close()
+        raw.close()
+
+    for row in rows:
+        if writer is None or (count % CSV_SIZE_CHECK_ROWS == 0 and raw.tell() >= MAX_PART_BYTES):
+            if writer is not None:
+                close()
+            parts.append(_new_part(directory, 'csv', len(parts) + 1))
+            raw = open(parts[-1], 'wb')
+            # No timestamp or temporary path in the header, so the same rows give the same file
+            gz = gzip.GzipFile(filename=os.path.basename(parts[-1]), fileobj=raw, mode='wb', mtime=0)
+            text = io.TextIOWrapper(gz, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow(EXPORT_HEADER)
+            count = 0
+        writer.writerow(row)
+        count += 1
+
+    if writer is not None:
+        close()
+    return parts
+
+
+def export_command_log(command_log, start=None, end=None, user=None, format='xlsx'):
+    """
+    Write the matching command log rows to one or more files.
+
+    Returns (directory, paths). The caller removes the directory once the
+    files have been sent. `paths` is empty when no rows match.
+    """
+    directory = tempfile.mkdtemp(prefix='user_log_')
+    rows = command_log.iter_events(start=start, end=end, user=user)
+    write = _write_csv if format == 'csv' else _write_xlsx
+    return directory, write(rows, directory)
@@ -0,0 +1,54 @@
+# fake_bot.py
+
+"""In-process stand-in for telegram.Bot, for running handlers and broadcasts offline."""
+
+import asyncio
+import itertools
+import random
+from types import SimpleNamespace
+
+from telegram.error import Forbidden, RetryAfter
+
+
+class FakeBot:
+    """
+    Records what would have been sent instead of calling Telegram.
+
+    `latency` is the simulated round-trip in seconds, `flood_rate` the fraction
+    of sends that raise RetryAfter(`retry_after`), and `blocked` a set of chat
+    IDs that raise Forbidden as if the user had blocked the bot.
+    """
+
+    def __init__(self, latency=0.0, flood_rate=0.0, retry_after=1, blocked=(), seed=0):
+        self.latency = latency
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.blocked = set(blocked)
+        self.sent = []
+        self.edits = []
+        self.floods = 0
+        self._random = random.Random(seed)
+        self._message_ids = itertools.count(1)
+
+    async def _call(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await self._call()
+        if self.flood_rate and self._random.random() < self.flood_rate:
+            self.floods += 1
+            raise RetryAfter(self.retry_after)
+        if chat_id in self.blocked:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        self.sent.append((chat_id, text, kwargs))
+        return SimpleNamespace(chat_id=chat_id, message_id=next(self._message_ids), text=text)
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        await self._call()
+        self.edits.append((chat_id, message_id, text, kwargs))
+        return SimpleNamespace(chat_id=chat_id, message_id=message_id, text=text)
+
+    async def answer_callback_query(self, callback_query_id, text=None, **kwargs):
+        await self._call()
+        return True
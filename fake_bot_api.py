@@ -0,0 +1,305 @@
+# fake_bot_api.py
+
+"""Local stand-in for the Telegram Bot API server.
+
+Point the bot at it with BOT_API_URL=http://127.0.0.1:8081/bot (any token
+works) to run main.py, announce.py or the load tests on one machine. It
+implements getUpdates (with long polling), sendMessage, sendPhoto,
+sendDocument, answerCallbackQuery and editMessageText. It also implements
+the getMe/setWebhook/deleteWebhook calls the bot makes on start.
+
+Every response can be delayed by `latency` seconds. A `flood_rate` fraction
+of send calls get 429 with retry_after, and chats in `blocked` get 403, as
+from a user who blocked the bot. Updates come from a replay file (the
+formats replay_updates.py reads) or are posted to /_control/updates while it
+runs. /_control/stats reports call counts, floods and the time from handing
+an update to the bot until the bot's first reply in that chat.
+
+Usage: python fake_bot_api.py [--port 8081] [--latency 0.05] [--flood-rate 0.01]
+       [--replay updates.json] [--replay-rate 50] [--blocked 1,2,3]
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+from flask import Flask, jsonify, request
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Fake Bot', 'username': 'fake_bot'}
+
+# Methods that send something to a chat; these are subject to floods and blocking
+SEND_METHODS = {'sendMessage', 'sendPhoto', 'sendDocument', 'editMessageText'}
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class FakeBotAPI:
+    """State of the fake server: queued updates, recorded calls and statistics."""
+
+    def __init__(self, latency=0.0, flood_rate=0.0, retry_after=1, blocked=(), seed=0):
+        self.latency = latency
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.blocked = set(blocked)
+        self.calls = defaultdict(int)
+        self.floods = 0
+        self.sent = deque(maxlen=10_000)  # The latest send calls, for inspection
+        self.reply_latencies = deque(maxlen=100_000)
+        self._random = random.Random(seed)
+        self._updates = deque()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self.files = set()  # file_ids handed out, which are the only ones sends accept
+        self._awaiting_reply = defaultdict(deque)  # chat_id -> times updates were handed out
+        self._lock = threading.Condition()
+        self._count_lock = threading.Lock()
+        self.started = time.monotonic()
+
+    # Updates
+
+    def add_updates(self, updates):
+        with self._lock:
+            for update in updates:
+                update = dict(update)
+                update['update_id'] = next(self._update_ids)
+                self._updates.append(update)
+            self._lock.notify_all()
+
+    def replay(self, updates, rate=None):
+        """Queue recorded updates, all at once or `rate` per second in the background."""
+        if not rate:
+            self.add_updates(updates)
+            return
+
+        def feed():
+            for update in updates:
+                self.add_updates([update])
+                time.sleep(1 / rate)
+
+        threading.Thread(target=feed, name="update-replay", daemon=True).start()
+
+    def get_updates(self, offset, limit, timeout):
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            # Confirmed updates are dropped, as Telegram does once the offset moves past them
+            while self._updates and self._updates[0]['update_id'] < offset:
+                self._updates.popleft()
+            while not self._updates and time.monotonic() < deadline:
+                self._lock.wait(deadline - time.monotonic())
+            batch = list(itertools.islice(self._updates, limit))
+            now = time.monotonic()
+            for update in batch:
+                chat_id = _update_chat_id(update)
+                if chat_id is not None and not update.get('_handed_out'):
+                    self._awaiting_reply[chat_id].append(now)
+                update['_handed_out'] = True
+            return [{k: v for k, v in update.items() if k != '_handed_out'} for update in batch]
+
+    # Sends
+
+    def check_send(self, method, chat_id):
+        """Return an error response for a flood or a blocked chat, or None."""
+        if self.flood_rate and self._random.random() < self.flood_rate:
+            self.floods += 1
+            return 429, {
+                'ok': False, 'error_code': 429,
+                'description': f"Too Many Requests: retry after {self.retry_after}",
+                'parameters': {'retry_after': self.retry_after},
+            }
+        if chat_id in self.blocked:
+            return 403, {'ok': False, 'error_code': 403, 'description': "Forbidden: bot was blocked by the user"}
+        return None
+
+    def record_send(self, method, chat_id, params):
+        now = time.monotonic()
+        with self._lock:
+            self.sent.append((method, chat_id, params))
+            waiting = self._awaiting_reply.get(chat_id)
+            if waiting:
+                self.reply_latencies.append(now - waiting.popleft())
+
+    def message(self, chat_id, **fields):
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': BOT_USER,
+            **fields,
+        }
+
+    def count(self, method):
+        with self._count_lock:
+            self.calls[method] += 1
+
+    def file(self, uploaded):
+        """A file_id for an upload, the same id when an existing one is sent again, or None for an unknown id."""
+        if isinstance(uploaded, str):
+            return uploaded if uploaded in self.files else None
+        file_id = f"FAKE-FILE-{next(self._file_ids)}"
+        self.files.add(file_id)
+        return file_id
+
+    def stats(self):
+        latencies = list(self.reply_latencies)
+        elapsed = time.monotonic() - self.started
+        sends = sum(self.calls[method] for method in SEND_METHODS)
+        return {
+            'calls': dict(self.calls),  # By Bot API method
+            'floods': self.floods,
+            'pending_updates': len(self._updates),
+            'sends_per_second': round(sends / elapsed, 1) if elapsed else 0.0,
+            'replies': len(latencies),
+            'reply_latency_ms': {
+                'p50': _ms(_percentile(latencies, 0.5)),
+                'p99': _ms(_percentile(latencies, 0.99)),
+                'max': _ms(max(latencies) if latencies else None),
+            },
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1e3, 2)
+
+
+def _update_chat_id(update):
+    if 'message' in update:
+        return update['message']['chat']['id']
+    if 'callback_query' in update:
+        return update['callback_query']['from']['id']
+    return None
+
+
+def _ok(result):
+    return jsonify({'ok': True, 'result': result})
+
+
+def _param(params, name, cast=str, default=None):
+    value = params.get(name)
+    if value is None or value == '':
+        return default
+    return cast(value)
+
+
+def _json_param(params, name):
+    value = params.get(name)
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def create_app(api):
+    """Flask app serving `api` at /bot<token>/<method>, plus the /_control routes."""
+    app = Flask(__name__)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    @app.route('/bot<token>/<method>', methods=['GET', 'POST'])
+    def bot_method(token, method):
+        params = dict(request.values)
+        params.update(request.get_json(silent=True) or {})
+        params.update({name: upload for name, upload in request.files.items()})
+        api.count(method)
+
+        if method == 'getUpdates':
+            # Latency is not added to long polls; they already wait for updates
+            updates = api.get_updates(_param(params, 'offset', int, 0), _param(params, 'limit', int, 100),
+                                      _param(params, 'timeout', float, 0))
+            return _ok(updates)
+
+        if api.latency:
+            time.sleep(api.latency)
+
+        if method == 'getMe':
+            return _ok(dict(BOT_USER, can_join_groups=True, can_read_all_group_messages=False,
+                            supports_inline_queries=False))
+        if method in ('setWebhook', 'deleteWebhook', 'answerCallbackQuery'):
+            return _ok(True)
+        if method == 'getWebhookInfo':
+            return _ok({'url': '', 'has_custom_certificate': False, 'pending_update_count': len(api._updates)})
+
+        if method not in SEND_METHODS:
+            return jsonify({'ok': False, 'error_code': 404, 'description': "Not Found"}), 404
+
+        chat_id = _param(params, 'chat_id', int)
+        error = api.check_send(method, chat_id)
+        if error is not None:
+            status, body = error
+            return jsonify(body), status
+
+        reply_markup = _json_param(params, 'reply_markup')
+        extra = {'reply_markup': reply_markup} if reply_markup else {}
+        if method in ('sendPhoto', 'sendDocument'):
+            upload = params.get('photo' if method == 'sendPhoto' else 'document')
+            file_id = api.file(upload)
+            if file_id is None:
+                return jsonify({'ok': False, 'error_code': 400,
+                                'description': "Bad Request: wrong file identifier/HTTP URL specified"}), 400
+
+        if method == 'sendMessage':
+            result = api.message(chat_id, text=params.get('text', ''), **extra)
+        elif method == 'editMessageText':
+            result = dict(api.message(chat_id, text=params.get('text', ''), **extra),
+                          message_id=_param(params, 'message_id', int), edit_date=int(time.time()))
+        elif method == 'sendPhoto':
+            photo = [{'file_id': file_id, 'file_unique_id': file_id, 'width': 800, 'height': 600}]
+            result = api.message(chat_id, photo=photo, caption=params.get('caption'), **extra)
+        else:
+            document = {'file_id': file_id, 'file_unique_id': file_id,
+                        'file_name': getattr(upload, 'filename', None) or 'document'}
+            result = api.message(chat_id, document=document, caption=params.get('caption'), **extra)
+
+        api.record_send(method, chat_id, {k: v for k, v in params.items() if isinstance(v, (str, int, float))})
+        return _ok(result)
+
+    @app.route('/_control/updates', methods=['POST'])
+    def post_updates():
+        updates = request.get_json()
+        api.add_updates(updates if isinstance(updates, list) else [updates])
+        return _ok(True)
+
+    @app.route('/_control/stats', methods=['GET'])
+    def get_stats():
+        return jsonify(api.stats())
+
+    return app
+
+
+def serve_in_thread(api, host='127.0.0.1', port=8081):
+    """Run the fake server in a daemon thread; returns its base URL for BOT_API_URL."""
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, create_app(api), threaded=True)
+    threading.Thread(target=server.serve_forever, name="fake-bot-api", daemon=True).start()
+    return f"http://{host}:{server.server_port}/bot", server
+
+
+if __name__ == "__main__":
+    from replay_updates import load_updates
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the Telegram Bot API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every call")
+    parser.add_argument('--flood-rate', type=float, default=0.0, help="fraction of sends answered with 429")
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--blocked', default='', help="comma-separated chat ids that get 403")
+    parser.add_argument('--replay', help="file of recorded updates to hand out")
+    parser.add_argument('--replay-rate', type=float, help="updates per second (default: all at once)")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    api = FakeBotAPI(args.latency, args.flood_rate, args.retry_after,
+                     [int(chat_id) for chat_id in args.blocked.split(',') if chat_id])
+    if args.replay:
+        api.replay(load_updates(args.replay), args.replay_rate)
+    print(f"Fake Bot API on http://{args.host}:{args.port}/bot "
+          f"(stats at http://{args.host}:{args.port}/_control/stats)")
+    create_app(api).run(host=args.host, port=args.port, threaded=True)
@@ -1,7 +1,5 @@
 import pandas as pd
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from datetime import datetime, timedelta
-import pytz
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -11,12 +9,28 @@ from telegram.ext import (
     CallbackContext,
     CallbackQueryHandler,
 )
-from io import BytesIO
 import os
+import shutil
 import logging
 import httpx
 import asyncio
 
+from broadcast import BroadcastStore, resume_broadcasts, start_broadcast
+from command_log import CommandLog
+from config import (
+    BOT_API_URL, BOT_FILE_URL, BOT_TOKEN, CONCURRENT_UPDATES, METRICS_LISTEN, METRICS_PORT, WEBHOOK_URL,
+    require_bot_token,
+)
+from export import ExportError, export_command_log, parse_export_args
+from executor import run_blocking, shutdown as shutdown_executor
+from media_cache import MediaCache
+from metrics import TimedRequest, cache_gauges, serve_metrics, summary as metrics_summary, track
+from query_router import build_router
+from rate_limit import Coalescer, RateLimiter, parse_limits
+from render import render_name_results, render_student_reply
+from render_cache import RenderCache
+from student_store import parse_section, section_code, shared_store
+
 # Set up logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -27,26 +41,21 @@ httpx_log.setLevel(logging.WARNING)
 
 # Load data from the Excel file for student info
 excel_file = 'data.xlsx'
-try:
-    df = pd.read_excel(excel_file, dtype={
-        'roll': str,
-        'phone': str,
-        'whatsapp': str,
-        'telegram': str,
-        'name': str,
-        'section-6th': str,
-        'section-5th': str,
-        'hostel': str,
-        'kiitmail': str,
-        'email': str
-    })
-except Exception as e:
-    logging.error(f"Error reading the Excel file: {e}")
-    df = pd.DataFrame()  # Initialize as empty DataFrame if there is an error
+# Reloaded in the background whenever the file changes; handlers read data.current
+data = shared_store(excel_file)
 
 # Load user IDs from the Excel files specified
 USER_COMMANDS_FILE = 'user_commands.xlsx'
-USER_LOG_FILE_PATH = "user_log.xlsx"
+USER_LOG_FILE_PATH = "user_log.xlsx"  # Legacy log, imported once into the command log
+
+# Every query is appended here by a background writer
+command_log = CommandLog()
+
+# Announcements and the outcome of each delivery
+broadcast_store = BroadcastStore()
+
+# file_ids of the photo and documents already uploaded to Telegram
+media_cache = MediaCache()
 
 def load_user_ids():
     if os.path.exists(USER_COMMANDS_FILE):
@@ -55,11 +64,8 @@ def load_user_ids():
     return set()
 
 def load_user_ids_from_log():
-    """Load user IDs from user_log.xlsx."""
-    if os.path.exists(USER_LOG_FILE_PATH):
-        df = pd.read_excel(USER_LOG_FILE_PATH)
-        return set(df['User ID'].dropna().astype(str).tolist())
-    return set()
+    """Load user IDs from the command log's users table."""
+    return {str(uid) for uid in command_log.user_ids()}
 
 def save_user_ids(user_ids):
     df = pd.DataFrame({'User ID': list(user_ids)})
@@ -71,38 +77,6 @@ user_ids = load_user_ids()
 # Initialize required constants
 AUTHORIZED_USER_ID = 6986667023  # Replace with your actual authorized user ID
 
-# Helper functions
-def escape_markdown_v2(text):
-    escape_chars = r"\_*[]()~`>#+-=|{}.!<>"
-    return ''.join(['\\' + char if char in escape_chars else char for char in text])
-
-def split_message(message, chunk_size=3500):
-    return [message[i:i + chunk_size] for i in range(0, len(message), chunk_size)]
-
-def get_contact_links(df: pd.DataFrame, roll_number: str) -> str:
-    student_data = df[df['roll'] == roll_number]
-
-    if student_data.empty:
-        return "Roll number not found."
-
-    student_row = student_data.iloc[0]
-    whatsapp_link = student_row.get('whatsapp', None)
-    telegram_link = student_row.get('telegram', None)
-
-    links = []
-    if pd.notna(whatsapp_link):
-        links.append(f"[WhatsApp]({whatsapp_link})")
-    else:
-        links.append(" ")
-
-    if pd.notna(telegram_link):
-        links.append(f"[Telegram]({telegram_link})")
-    else:
-        links.append(" ")
-
-    contact_links_message = " | ".join(links)  # Escape the '|' character
-    return contact_links_message
-
 # Command Handlers
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     username = update.effective_user.username or "N/A"
@@ -110,8 +84,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     local_photo_path = "xen.jpg"  # Replace this with your own local image path
 
-    with open(local_photo_path, 'rb') as photo:
-        await update.message.reply_photo(photo=photo, caption=message)
+    # Uploaded once, then sent by file_id
+    await media_cache.send(local_photo_path, lambda photo: update.message.reply_photo(photo=photo, caption=message))
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     help_text = (
@@ -123,7 +97,10 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "✖️ ✖️✖️✖️✖️✖️✖️✖️✖️ ✖️\n\n"
         "⭕️Admins only commands\n"
         "/users\n"
-        "/announce"
+        "/announce\n"
+        "/reload\n"
+        "/stats\n"
+        "/limits"
     )
     await update.message.reply_text(help_text)
 
@@ -133,6 +110,17 @@ SPECIAL_ROLL_NUMBERS = {
     
 }
 
+# Rendered replies for roll numbers, reused until the data is reloaded
+reply_cache = RenderCache()
+cache_gauges('bot_reply_cache', reply_cache)
+
+# Per-user limits in front of handle_query and button_handler; admins are exempt
+limiter = RateLimiter(is_exempt=lambda user_id: is_authorized(user_id))
+# Identical name searches running at the same time share one search
+name_searches = Coalescer()
+# Classifies typed queries; unknown rolls and sections and junk never reach a lookup
+query_router = build_router(SPECIAL_ROLL_NUMBERS)
+
 async def get_data(update: Update, context: ContextTypes.DEFAULT_TYPE, roll_number: str):
     # Check if the roll number is in the list of special ones
     if roll_number in SPECIAL_ROLL_NUMBERS:
@@ -143,44 +131,14 @@ async def get_data(update: Update, context: ContextTypes.DEFAULT_TYPE, roll_numb
         await update.message.reply_text(special_message)
         return
 
-    student_data = df[df['roll'] == roll_number]
-
-    if not student_data.empty:
-        row = student_data.iloc[0]
-        message_parts = []
-
-        # Only add details that are not NaN
-        if pd.notna(row.get('name')):
-            message_parts.append(f"Name: {row['name']}")
-        if pd.notna(row.get('roll')):
-            message_parts.append(f"Roll No: {row['roll']}")
-        if pd.notna(row.get('section-6th')):
-            message_parts.append(f"Section (6th): {row['section-6th']}")
-        if pd.notna(row.get('section-5th')):
-            message_parts.append(f"Section (5th): {row['section-5th']}")
-        if pd.notna(row.get('sec2nd')):
-            message_parts.append(f"Section (2nd yr): {row['sec2nd']}")    
-        if pd.notna(row.get('phone')):
-            message_parts.append(f"Phone: {row['phone']}")
-        if pd.notna(row.get('hostel')):
-            message_parts.append(f"Hostel: {row['hostel']}")
-        if pd.notna(row.get('kiitmail')):
-            message_parts.append(f"KIIT Email: {row['kiitmail']}")
-        if pd.notna(row.get('email')):
-            message_parts.append(f"Email: {row['email']}")
-
-        # Join the message parts with line breaks
-        message = "\n\n".join(message_parts)
-
-        # Retrieve and append contact links if they exist
-        contact_links = get_contact_links(df, roll_number)
-        if contact_links and contact_links.strip():  # Only add if there are actual links available
-            message += "\n\n" + contact_links.strip()
-
-        # Send message
-        for chunk in split_message(message):
+    store = data.current
+    reply = reply_cache.get_or_render(
+        roll_number, store.version, lambda: render_student_reply(store.get(roll_number)))
+
+    if reply is not None:
+        for chunk in reply.chunks:
             try:
-                await update.message.reply_text(chunk, parse_mode='Markdown', disable_web_page_preview=True)
+                await update.message.reply_text(chunk, parse_mode=reply.parse_mode, disable_web_page_preview=True)
             except Exception as e:
                 logging.error(f"Failed to send message: {chunk}. Error: {e}")
     else:
@@ -208,36 +166,17 @@ async def get_section(update: Update, context: ContextTypes.DEFAULT_TYPE, sectio
     reply_markup = InlineKeyboardMarkup(keyboard)#+
     await update.message.reply_text(f"Please choose the year for {branch}-{section_number.zfill(2)}:", reply_markup=reply_markup)#+
 #+
-async def button_handler(update: Update, context: CallbackContext):#+
-    query = update.callback_query#+
-    await query.answer()#+
-#+
-    data = query.data.split("_")#+
-    if data[0] == "section":#+
-        year = data[1]#+
-        branch = data[2]#+
-        section_number = data[3]#+
-        await send_section_data(update, context, f"{branch}-{section_number}", year)#+
 async def send_section_data(update: Update, context: ContextTypes.DEFAULT_TYPE, section: str, year: str):
-    if year == "2":
-      
-        section_data = df[df['sec2nd'].str.contains(section, na=False)]#+
-    else:
-       
-        section_data = df[df['section-6th'].str.contains(section, na=False)]#+
-
-    if not section_data.empty:
-        total_students = len(section_data)
-        male_students = section_data['hostel'].str.startswith('KP').sum()
-        female_students = section_data['hostel'].str.startswith('QC').sum()
-        day_scholars = total_students - male_students - female_students
+    # Counts were computed when the data was loaded
+    section_info = data.current.section(year, section)
 
+    if section_info is not None:
         section_message = (
 
-            f"TOTAL STUDENTS : {total_students}\n\n"
-            f"MALE   ------------ {male_students}\n"
-            f"FEMALE   ---------- {female_students}\n"
-            f"DAY SCHOLARS  -- {day_scholars}\n"
+            f"TOTAL STUDENTS : {section_info.total}\n\n"
+            f"MALE   ------------ {section_info.male}\n"
+            f"FEMALE   ---------- {section_info.female}\n"
+            f"DAY SCHOLARS  -- {section_info.day_scholars}\n"
         )
 
         keyboard = [
@@ -263,66 +202,123 @@ async def button_handler(update: Update, context: CallbackContext):#+
         year = data[1]#+
         branch = data[2]#+
         section_number = data[3]#+
-        await send_section_data(update, context, f"{branch}-{section_number}", year)#+
-    elif data[0] == "full_list":#+
-        year = data[1]#+
-        section = "_".join(data[2:])  # Join the rest of the data to get the full section name#+
-        await send_full_student_list(update, context, section, year)#+
-
+        with track('section_callback'):
+            await send_section_data(update, context, f"{branch}-{section_number}", year)#+
+    elif query.data.startswith("full_list_"):
+        year = data[2]
+        section = "_".join(data[3:])  # Join the rest of the data to get the full section name#+
+        with track('full_list'):
+            await send_full_student_list(update, context, section, year)#+
+    elif data[0] == "name":
+        page = int(data[1])
+        name = "_".join(data[2:])
+        with track('name_page'):
+            await send_name_page(update, context, name, page)
+    elif data[0] == "ro":
+        year, section, page = data[1], data[2], int(data[3])
+        with track('roster_page'):
+            await send_roster_page(update, context, section, year, page)
+
+
+# Telegram rejects inline buttons whose callback data is longer than this
+MAX_CALLBACK_BYTES = 64
+
+def callback_data_fits(buttons):
+    return all(len(button.callback_data.encode()) <= MAX_CALLBACK_BYTES for button in buttons)
+
+def roster_markup(year: str, section: str, page: int, page_count: int):
+    """Prev/Next buttons for a roster page; callback data is "ro_<year>_<section>_<page>"."""
+    key = parse_section(section)
+    if key is None:
+        return None
+    code = section_code(*key)
+
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"ro_{year}_{code}_{page - 1}"))
+    if page + 1 < page_count:
+        buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"ro_{year}_{code}_{page + 1}"))
+    if not buttons or not callback_data_fits(buttons):
+        return None
+    return InlineKeyboardMarkup([buttons])
 
 async def send_full_student_list(update: Update, context: ContextTypes.DEFAULT_TYPE, section: str, year: str):#+
-    if year == "2":#+
-        section_data = df[df['sec2nd'].str.contains(section, na=False)]#+
-    else:#+
-        section_data = df[df['section-6th'].str.contains(section, na=False)]#+
+    # The roster pages were rendered when the data was loaded; the first one opens the list
+    section_info = data.current.section(year, section)
+
+    if section_info is not None:
+        pages = section_info.roster_pages
+        try:
+            await update.callback_query.message.reply_text(
+                pages[0], parse_mode='MarkdownV2', reply_markup=roster_markup(year, section, 0, len(pages)))
+        except Exception as e:
+            logging.error(f"Error sending full student list: {e}")
+    else:
+        await update.callback_query.message.reply_text("No students found in this section.")
 
-    if not section_data.empty:
-        message_parts = []
-        for _, row in section_data.iterrows():
+async def send_roster_page(update: Update, context: ContextTypes.DEFAULT_TYPE, section: str, year: str, page: int):
+    # Prev/Next edit the roster message in place instead of sending another one
+    section_info = data.current.section(year, section)
+    if section_info is None:
+        await update.callback_query.message.reply_text("No students found in this section.")
+        return
 
-            details = f"Name: {escape_markdown_v2(row['name'])}\nRoll No: {escape_markdown_v2(row['roll'])}\n"#+
-            message_parts.append(details)
+    pages = section_info.roster_pages
+    page = min(max(page, 0), len(pages) - 1)  # The section may have shrunk since the buttons were sent
+    try:
+        await update.callback_query.edit_message_text(
+            pages[page], parse_mode='MarkdownV2', reply_markup=roster_markup(year, section, page, len(pages)))
+    except Exception as e:
+        logging.error(f"Error editing student list page: {e}")
 
 
-        for chunk in split_message("\n\n".join(message_parts)):#+
-            try:
-                await update.callback_query.message.reply_text(chunk, parse_mode='MarkdownV2')
-            except Exception as e:
-                logging.error(f"Error sending full student list: {e}")
-    else:
-        await update.callback_query.message.reply_text("No students found in this section.")
 
+# Name search results are sent a page at a time
+NAME_PAGE_SIZE = 20
+
+def name_page(name: str, page: int):
+    """Render one page of name results and the buttons to move between pages."""
+    start = page * NAME_PAGE_SIZE
+    total, fragments = data.current.search_name_fragments(name, start, NAME_PAGE_SIZE)
+    if not fragments:
+        return None, None
+
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"name_{page - 1}_{name}"))
+    if start + NAME_PAGE_SIZE < total:
+        buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"name_{page + 1}_{name}"))
+
+    # Telegram rejects long callback data; very long queries only get the first page
+    if not callback_data_fits(buttons):
+        buttons = []
 
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+    return render_name_results(fragments, start, total), reply_markup
 
 async def get_by_name(update: Update, context: ContextTypes.DEFAULT_TYPE, name: str):
     name = ' '.join(name.split()).strip().lower()
-    name_data = df[df['name'].str.contains(name, case=False, na=False)]
-
-    if not name_data.empty:
-        message_parts = []
-        for _, row in name_data.iterrows():
-            escaped_name = escape_markdown_v2(row['name'] if pd.notna(row['name']) else '')
-            escaped_roll = escape_markdown_v2(row['roll'] if pd.notna(row['roll']) else '')
-            escaped_section = escape_markdown_v2(row['section-6th'] if pd.notna(row['section-6th']) else '')
-            hostel = row['hostel']
-            hostel_info = "Day Scholar" if pd.isna(hostel) or not hostel.startswith(('KP', 'QC')) else hostel
-
-            message_parts.append(
-                f"Name: {escaped_name}\n"
-                f"Roll No: {escaped_roll}\n"
-                f"Section: {escaped_section}\n"
-                f"Hostel: {escape_markdown_v2(hostel_info)}\n\n"
-            )
-
-        message = "".join(message_parts)
-        for chunk in split_message(message):
-            try:
-                await update.message.reply_text(chunk, parse_mode='MarkdownV2')
-            except Exception as e:
-                logging.error(f"Error sending message by name: {e}")
+    message, reply_markup = await name_searches.run(
+        (data.version, name, 0), lambda: run_blocking("name search", name_page, name, 0))
+
+    if message is not None:
+        try:
+            await update.message.reply_text(message, parse_mode='MarkdownV2', reply_markup=reply_markup)
+        except Exception as e:
+            logging.error(f"Error sending message by name: {e}")
     else:
         await update.message.reply_text("No students found with this name.")
 
+async def send_name_page(update: Update, context: ContextTypes.DEFAULT_TYPE, name: str, page: int):
+    message, reply_markup = await name_searches.run(
+        (data.version, name, page), lambda: run_blocking("name search", name_page, name, page))
+
+    if message is not None:
+        try:
+            await update.callback_query.edit_message_text(message, parse_mode='MarkdownV2', reply_markup=reply_markup)
+        except Exception as e:
+            logging.error(f"Error sending message by name: {e}")
+
 
 async def handle_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.message.text.strip()
@@ -331,21 +327,26 @@ async def handle_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
     username = update.effective_user.username or "N/A"
     log_user_command(username, user_id, query)  # Log the command
 
-   
-    # Check if the query matches the new section format (e.g., CSE-01)#+
-    if '-' in query and len(query.split('-')) == 2:#+
-        await get_section(update, context, query)#+
-    # Check if the query is a roll number (5-9 digits)#+
-    elif query.isdigit() and len(query) in range(5, 10):#+
-        await get_data(update, context, query)
-    # Check if the query is a section number in the old format (1-2 digits)#+
-    elif query.isdigit() and len(query) in range(1, 3):#+
-        # Convert old format to new format (assuming CSE as default branch)#+
-        new_query = f"CSE-{query.zfill(2)}"#+
-        await get_section(update, context, new_query)#+
-    # If none of the above, treat it as a name search#+
-    else:
-        await get_by_name(update, context, query)
+    # Section codes and old section numbers arrive as "CSE-05"; names are normalised
+    route = query_router.route(query, data.current)
+    with track(route.name):
+        await QUERY_HANDLERS[route.name](update, context, route.argument)
+
+def canned_reply(text):
+    """A query handler that only sends `text`, for queries that can't match anything."""
+    async def reply(update: Update, context: ContextTypes.DEFAULT_TYPE, argument: str):
+        await update.message.reply_text(text)
+    return reply
+
+QUERY_HANDLERS = {
+    'section': get_section,
+    'legacy_section': get_section,
+    'roll': get_data,
+    'name': get_by_name,
+    'unknown_roll': canned_reply("Roll number not found."),
+    'unknown_section': canned_reply("Section not found."),
+    'junk': canned_reply("Send a roll number, a section like CSE-05 or a name.\nUse /help to see everything I can do."),
+}
 
 
 
@@ -353,52 +354,8 @@ async def handle_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 def log_user_command(username, user_id, query):
-    try:
-        # Create an IST timezone object
-        ist = pytz.timezone('Asia/Kolkata')
-
-        # Get current timestamp in IST
-        timestamp = datetime.now(ist).strftime('%Y-%m-%d %H:%M:%S')
-
-        if os.path.exists(USER_LOG_FILE_PATH):
-            df = pd.read_excel(USER_LOG_FILE_PATH)
-        else:
-            df = pd.DataFrame(columns=['User ID', 'Username', 'Commands'])
-
-        # Find the user's index
-        user_indices = df.index[df['User ID'] == user_id].tolist()
-
-        if user_indices:
-            # User exists, update their record
-            user_index = user_indices[0]
-            
-            # Get current commands
-            current_commands = df.at[user_index, 'Commands']
-
-            # If column is empty, initialize it
-            if pd.isna(current_commands):
-                current_commands = f"{query} [{timestamp}]"
-            else:
-                # Append new command with timestamp
-                current_commands = f"{current_commands}, {query} [{timestamp}]"
-
-            # Update the row
-            df.at[user_index, 'Commands'] = current_commands
-
-        else:
-            # New user, create a new row
-            new_data = pd.DataFrame({
-                'User ID': [user_id], 
-                'Username': [username], 
-                'Commands': [f"{query} [{timestamp}]"]
-            })
-            df = pd.concat([df, new_data], ignore_index=True)
-
-        # Save to Excel
-        df.to_excel(USER_LOG_FILE_PATH, index=False)  
-
-    except Exception as e:
-        logging.error(f"Failed to log command for {username}: {e}")
+    # Only queues the event; the command log writes it to disk in batches
+    command_log.log(user_id, username, query)
 
 
 
@@ -406,21 +363,29 @@ async def users_command(update: Update, context: CallbackContext):
     user_id = update.effective_user.id
 
     if is_authorized(user_id):
-        if os.path.exists(USER_LOG_FILE_PATH):
-            user_logs_df = pd.read_excel(USER_LOG_FILE_PATH)
-            
-            with BytesIO() as user_log_file_buffer:
-                with pd.ExcelWriter(user_log_file_buffer, engine='openpyxl') as writer:
-                    user_logs_df.to_excel(writer, index=False, sheet_name='User Logs')
-                
-                user_log_file_buffer.seek(0)
-
-                await update.message.reply_document(
-                    document=user_log_file_buffer, 
-                    filename='user_log.xlsx'
-                )
-        else:
-            await update.message.reply_text("User log file not found.")
+        try:
+            options = parse_export_args(context.args)
+        except ExportError as e:
+            await update.message.reply_text(
+                f"{e}\nUsage: /users [from=YYYY-MM-DD] [to=YYYY-MM-DD] [user=<id or @name>] [format=xlsx|csv]")
+            return
+
+        # Streamed from the command log into files on disk, split to fit Telegram's upload limit
+        directory, parts = await run_blocking("users export", export_command_log, command_log, **options)
+        try:
+            if parts:
+                for path in parts:
+                    filename = os.path.basename(path)
+                    # An export identical to one sent before goes out by file_id
+                    await media_cache.send(
+                        path,
+                        lambda document: update.message.reply_document(document=document, filename=filename),
+                        key=f"users/{filename}",
+                    )
+            else:
+                await update.message.reply_text("No user logs found.")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
     else:
         await update.message.reply_text("You are not authorized to access this command.")
 
@@ -441,8 +406,8 @@ async def announce(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Please provide a message to announce.")
         return
 
-    # Loading user is from user_log.xlsx
-    user_ids = load_user_ids_from_log()
+    # Loading user IDs from the command log
+    user_ids = await run_blocking("load announce audience", load_user_ids_from_log)
 
     if not user_ids:
         await update.message.reply_text("No user IDs found for announcements.")
@@ -450,31 +415,117 @@ async def announce(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     logging.info("User IDs to send announcements: %s", user_ids)
 
-    for uid in user_ids:
+    # Runs in the background so the bot keeps answering lookups meanwhile
+    await start_broadcast(context.application, broadcast_store, announcement_message,
+                          update.effective_chat.id, user_ids)
+
+async def reload_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_authorized(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to access this command.")
+        return
+
+    # The rebuild runs in a worker thread; lookups keep using the old data until it is done
+    reloaded = await run_blocking("data reload", data.reload)
+    stats = data.stats()
+    status = "Reloaded" if reloaded else "Reload failed, still serving"
+    await update.message.reply_text(
+        f"{status} data version {stats['version']}\n"
+        f"Rows: {stats['rows']}\n"
+        f"Last rebuild: {stats['last_rebuild_seconds']:.2f}s"
+    )
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_authorized(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to access this command.")
+        return
+
+    cache = reply_cache.stats()
+    media = media_cache.stats()
+    await update.message.reply_text(
+        f"{metrics_summary()}\n\n"
+        f"Reply cache: {cache['hits']} hits, {cache['misses']} misses "
+        f"({cache['hit_rate']:.0%} hit rate), {cache['size']} entries\n"
+        f"Media: {media['hits']} sent by file_id, {media['uploads']} uploads\n"
+        f"Data version: {data.version}\n"
+        f"Dropped log events: {command_log.dropped}"
+    )
+
+async def limits_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_authorized(update.effective_user.id):
+        await update.message.reply_text("You are not authorized to access this command.")
+        return
+
+    if context.args:
         try:
-            await context.bot.send_message(chat_id=uid, text=announcement_message)
-        except Exception as e:
-            logging.error(f"Could not send message to {uid}: {e}")
+            await limiter.set_limits(**parse_limits(context.args))
+        except ValueError as e:
+            await update.message.reply_text(
+                f"{e}\nUsage: /limits rate=0.5 burst=5 max_concurrent=16 button_window=2")
+            return
+
+    limits = "\n".join(f"{name}: {value}" for name, value in limiter.limits().items())
+    await update.message.reply_text(f"Current limits:\n{limits}\nQueries running: {limiter.active}")
 
 def is_authorized(user_id):
     return user_id == AUTHORIZED_USER_ID  # authorization checking
 
-# mirch mashala
-def main():
-    user_ids = load_user_ids_from_log()  # Load user IDs from user_log.xlsx
-    
-    application = Application.builder().token("8035259116:AAEGPqGEifZr6Srjw_IjslJggjeyuJsZQRA").build()  # kripiya apna apna Token dale 
+async def resume_announcements(application: Application):
+    await resume_broadcasts(application, broadcast_store)  # Finish broadcasts cut short by a restart
+
+async def close_command_log(application: Application):
+    command_log.close()  # Flush queued events before exiting
+    shutdown_executor()
+
+def build_application(webhook=False, token=BOT_TOKEN, base_url=BOT_API_URL, base_file_url=BOT_FILE_URL):
+    builder = (
+        Application.builder()
+        .token(token)  # BOT_TOKEN from the environment
+        .base_url(base_url)
+        .base_file_url(base_file_url)
+        .request(TimedRequest(connection_pool_size=256))  # Records every Bot API call's latency
+        .post_init(resume_announcements)
+        .post_shutdown(close_command_log)
+        .concurrent_updates(CONCURRENT_UPDATES)  # Serve independent chats in parallel
+    )
+    if webhook:
+        builder = builder.updater(None)  # Updates are pushed to webhook.py instead of polled
+    else:
+        builder = builder.get_updates_request(TimedRequest())
+    application = builder.build()
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("users", users_command))
     application.add_handler(CommandHandler("announce", announce))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_query))
+    application.add_handler(CommandHandler("reload", reload_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("limits", limits_command))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, limiter.wrap(handle_query)))
 
     # Add the callback query handler
-    application.add_handler(CallbackQueryHandler(button_handler))
+    application.add_handler(CallbackQueryHandler(limiter.wrap(button_handler)))
+    return application
 
-    application.run_polling()
+# mirch mashala
+def main():
+    require_bot_token()
+    command_log.migrate_legacy_logs(USER_LOG_FILE_PATH, USER_COMMANDS_FILE)  # No-op after the first run
+    user_ids = load_user_ids_from_log()  # Load user IDs from the command log
+    data.watch()  # Pick up changes to data.xlsx without a restart
+
+    if WEBHOOK_URL:
+        # Telegram pushes updates to the same server that hosts the student web UI
+        from app import app as web_app
+        from webhook import run_webhook
+
+        asyncio.run(run_webhook(build_application(webhook=True), web_app))
+    else:
+        if METRICS_PORT:
+            try:
+                serve_metrics(METRICS_LISTEN, METRICS_PORT)  # The web UI runs in another process
+            except OSError as e:
+                logging.error(f"Not serving metrics on {METRICS_LISTEN}:{METRICS_PORT}: {e}")
+        build_application().run_polling()
 
 if __name__ == "__main__":
     main()
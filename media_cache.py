@@ -0,0 +1,120 @@
+# media_cache.py
+
+"""Telegram file_ids for files the bot sends again and again.
+
+A file is uploaded once; the file_id Telegram returns is stored in SQLite
+with the SHA-256 of the file, and later sends pass the file_id instead of
+uploading. The hash is only recomputed when the file's size or modification
+time changes, so an unchanged file costs one stat() per send. A changed file,
+or a file_id Telegram rejects (it belongs to another bot, or has expired), is
+uploaded again and the stored id replaced.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+
+from telegram.error import BadRequest
+
+from executor import run_blocking
+from snapshot import file_hash
+
+MEDIA_CACHE_DB = 'media_cache.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    key      TEXT PRIMARY KEY,
+    sha256   TEXT NOT NULL,
+    file_id  TEXT NOT NULL,
+    uploaded REAL NOT NULL
+);
+"""
+
+
+def sent_file_id(message):
+    """file_id of the photo or document in a sent message."""
+    if message.photo:
+        return message.photo[-1].file_id  # The largest size; any of them can be sent back
+    if message.document:
+        return message.document.file_id
+    return None
+
+
+class MediaCache:
+    """Persistent map of file (by key and content hash) to Telegram file_id."""
+
+    def __init__(self, path=MEDIA_CACHE_DB):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.uploads = 0
+        self.hits = 0
+        self._stats = {}  # key -> (size, mtime_ns, sha256) of the file last hashed
+        self._locks = {}
+
+    def get(self, key, sha256):
+        row = self.conn.execute("SELECT file_id FROM media WHERE key = ? AND sha256 = ?", (key, sha256)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, sha256, file_id):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO media (key, sha256, file_id, uploaded) VALUES (?, ?, ?, ?)",
+                (key, sha256, file_id, time.time()),
+            )
+
+    def forget(self, key):
+        with self.conn:
+            self.conn.execute("DELETE FROM media WHERE key = ?", (key,))
+
+    async def _hash(self, key, path):
+        stat = os.stat(path)
+        known = self._stats.get(key)
+        if known and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2]
+        sha256 = await run_blocking(f"hash {key}", file_hash, path)
+        self._stats[key] = (stat.st_size, stat.st_mtime_ns, sha256)
+        return sha256
+
+    async def send(self, path, send, key=None):
+        """
+        Send the file at `path` with `send(file)`, which gets either a file_id
+        or an open file and returns the sent Message (reply_photo,
+        reply_document, ...). `key` names the file in the cache and defaults
+        to the path.
+        """
+        key = key or path
+        sha256 = await self._hash(key, path)
+
+        file_id = self.get(key, sha256)
+        if file_id is not None:
+            try:
+                message = await send(file_id)
+                self.hits += 1
+                return message
+            except BadRequest as e:
+                logging.warning(f"Telegram rejected the cached file_id for {key} ({e}), uploading again")
+                self.forget(key)
+
+        # One upload per file; concurrent sends of the same file wait for its file_id
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            file_id = self.get(key, sha256)
+            if file_id is not None:
+                self.hits += 1
+                return await send(file_id)
+            with open(path, 'rb') as f:
+                message = await send(f)
+            self.uploads += 1
+            file_id = sent_file_id(message)
+            if file_id is not None:
+                self.put(key, sha256, file_id)
+            return message
+
+    def stats(self):
+        return {'hits': self.hits, 'uploads': self.uploads}
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,263 @@
+# metrics.py
+
+"""In-process counters and latency histograms, exported in Prometheus text format.
+
+Recording is an uncontended lock plus a couple of integer updates, cheap
+enough to leave on in production. Everything lives in the module-level
+REGISTRY, which the Flask /metrics route and the bot's /stats command read.
+The Flask route only sees the web process, so a polling bot, which runs
+apart from it, serves its own /metrics through serve_metrics().
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram.request import HTTPXRequest
+
+# Upper bounds in seconds, from fast dictionary hits to slow Telegram calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.values().items()):
+            lines.append(f"{self.name}{_label_text(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then sum and count
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+
+    def quantile(self, q, *label_values):
+        """Estimate a quantile from the buckets (the upper bound of the bucket it falls in)."""
+        series = self.snapshot().get(label_values)
+        if not series or not series[2]:
+            return None
+        counts, _, count = series
+        rank = q * count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ('le',)
+        for label_values, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_label_text(names, label_values + (le,))} {cumulative}")
+            label_text = _label_text(self.labels, label_values)
+            lines.append(f"{self.name}_sum{label_text} {total}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback when the metrics are rendered."""
+
+    def __init__(self, name, help, read):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.read()}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, read):
+        with self._lock:
+            # Re-registering replaces the callback, e.g. when a cache is recreated
+            self._metrics[name] = Gauge(name, help, read)
+            return self._metrics[name]
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Bot handlers, labelled by route (roll, section, name, section_callback, full_list, ...)
+HANDLER_SECONDS = REGISTRY.histogram(
+    'bot_handler_seconds', "Time spent handling an update, by route.", ('route',))
+HANDLER_ERRORS = REGISTRY.counter(
+    'bot_handler_errors_total', "Handler calls that raised, by route.", ('route',))
+
+# Every Bot API call made by the bot, labelled by method (sendMessage, editMessageText, ...)
+TELEGRAM_SECONDS = REGISTRY.histogram(
+    'telegram_api_seconds', "Bot API request latency, by method.", ('method',))
+TELEGRAM_ERRORS = REGISTRY.counter(
+    'telegram_api_errors_total', "Bot API requests that failed, by method.", ('method',))
+
+# Flask views, labelled by endpoint
+HTTP_SECONDS = REGISTRY.histogram(
+    'http_request_seconds', "Web request latency, by endpoint.", ('endpoint',))
+
+
+@contextmanager
+def track(route):
+    """Time a handler under `route` and count it as an error if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        HANDLER_ERRORS.inc(route)
+        raise
+    finally:
+        HANDLER_SECONDS.observe(time.perf_counter() - start, route)
+
+
+def cache_gauges(prefix, cache):
+    """Export a RenderCache's hit and miss counters."""
+    REGISTRY.gauge(f'{prefix}_hits', f"{prefix} hits since start.", lambda: cache.hits)
+    REGISTRY.gauge(f'{prefix}_misses', f"{prefix} misses since start.", lambda: cache.misses)
+    REGISTRY.gauge(f'{prefix}_size', f"{prefix} entries held.", lambda: len(cache))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the bot's log
+
+
+def serve_metrics(host, port):
+    """
+    Serve REGISTRY at http://host:port/metrics from a daemon thread.
+
+    The web UI's /metrics only sees its own process; in polling mode the bot
+    runs apart from it and exports its handler and Bot API metrics here.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+class TimedRequest(HTTPXRequest):
+    """HTTPXRequest that records the latency and failures of every Bot API call."""
+
+    async def do_request(self, url, *args, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        start = time.perf_counter()
+        try:
+            status_code, payload = await super().do_request(url, *args, **kwargs)
+        except Exception:
+            TELEGRAM_ERRORS.inc(api_method)
+            raise
+        finally:
+            TELEGRAM_SECONDS.observe(time.perf_counter() - start, api_method)
+        if status_code >= 400:
+            TELEGRAM_ERRORS.inc(api_method)
+        return status_code, payload
+
+
+def summary():
+    """Plain-text digest of the handler and Bot API metrics, for the /stats command."""
+    lines = []
+    for title, histogram, errors in (
+        ("Handlers", HANDLER_SECONDS, HANDLER_ERRORS),
+        ("Telegram API", TELEGRAM_SECONDS, TELEGRAM_ERRORS),
+    ):
+        error_counts = errors.values()
+        lines.append(f"{title}:")
+        series = histogram.snapshot()
+        if not series:
+            lines.append("  (none yet)")
+        for (label,), (_, total, count) in sorted(series.items()):
+            p50 = histogram.quantile(0.5, label)
+            p99 = histogram.quantile(0.99, label)
+            lines.append(
+                f"  {label}: {count} calls, avg {total / count * 1e3:.1f} ms, "
+                f"p50 ≤{p50 * 1e3:.0f} ms, p99 ≤{p99 * 1e3:.0f} ms, "
+                f"{error_counts.get((label,), 0)} errors"
+            )
+        lines.append("")
+    return "\n".join(lines).rstrip()
@@ -0,0 +1,141 @@
+# name_search.py
+
+"""Name search over the student table.
+
+Names are split into normalised tokens. Each distinct token is indexed by its
+trigrams, and each token points at the rows that contain it. A query token
+matches indexed tokens exactly, by prefix, or by trigram similarity (so small
+typos still match). A row must match every query token.
+"""
+
+import re
+from array import array
+from bisect import bisect_left
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+# Score given to each kind of token match; a row's score is the sum over query tokens
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+FUZZY_WEIGHT = 0.6
+
+# Minimum trigram similarity (Dice coefficient) for a typo match
+FUZZY_THRESHOLD = 0.5
+
+# Upper bound on typo matches a single query token may expand to
+MAX_FUZZY_MATCHES = 50
+
+
+def normalize(text):
+    """Lower-case `text` and split it into alphanumeric tokens."""
+    if not isinstance(text, str):
+        return []
+    return _NON_ALNUM.sub(' ', text.lower()).split()
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Inverted trigram index over a list of names, one per row position."""
+
+    def __init__(self, names):
+        token_ids = {}
+        postings = []
+
+        for position, name in enumerate(names):
+            for token in set(normalize(name)):
+                token_id = token_ids.get(token)
+                if token_id is None:
+                    token_id = token_ids[token] = len(postings)
+                    postings.append(array('i'))
+                postings[token_id].append(position)
+
+        self._tokens = list(token_ids)
+        self._token_ids = token_ids
+        self._postings = postings
+        self._sorted_tokens = sorted(token_ids)
+
+        self._trigram_index = {}
+        self._trigram_counts = []
+        for token_id, token in enumerate(self._tokens):
+            grams = trigrams(token)
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._trigram_index.setdefault(gram, []).append(token_id)
+
+    def _prefix_matches(self, token):
+        matches = []
+        start = bisect_left(self._sorted_tokens, token)
+        for candidate in self._sorted_tokens[start:]:
+            if not candidate.startswith(token):
+                break
+            matches.append(self._token_ids[candidate])
+        return matches
+
+    def _fuzzy_matches(self, token):
+        grams = trigrams(token)
+        shared = {}
+        for gram in grams:
+            for token_id in self._trigram_index.get(gram, ()):
+                shared[token_id] = shared.get(token_id, 0) + 1
+
+        matches = []
+        for token_id, count in shared.items():
+            similarity = 2 * count / (len(grams) + self._trigram_counts[token_id])
+            if similarity >= FUZZY_THRESHOLD:
+                matches.append((similarity * FUZZY_WEIGHT, token_id))
+        matches.sort(reverse=True)
+        return matches[:MAX_FUZZY_MATCHES]
+
+    def _expand(self, token):
+        """Return {token_id: score} for the indexed tokens matching one query token."""
+        scores = {}
+        for score, token_id in self._fuzzy_matches(token) if len(token) >= 3 else ():
+            scores[token_id] = score
+        for token_id in self._prefix_matches(token):
+            scores[token_id] = max(scores.get(token_id, 0), PREFIX_SCORE)
+        exact = self._token_ids.get(token)
+        if exact is not None:
+            scores[exact] = EXACT_SCORE
+        return scores
+
+    def search(self, query, offset=0, limit=20):
+        """
+        Rank the rows whose name matches `query`.
+
+        Returns (total, positions) where `positions` holds at most `limit` row
+        positions starting at `offset`, best match first.
+        """
+        tokens = list(dict.fromkeys(normalize(query)))
+        if not tokens:
+            return 0, []
+
+        row_scores = None
+        for token in tokens:
+            expansions = self._expand(token)
+            if not expansions:
+                return 0, []
+
+            # Best score of this query token for every row it matches
+            best = {}
+            for token_id, score in sorted(expansions.items(), key=lambda item: -item[1]):
+                for position in self._postings[token_id]:
+                    if position not in best:
+                        best[position] = score
+
+            if row_scores is None:
+                row_scores = best
+            else:
+                row_scores = {
+                    position: score + best[position]
+                    for position, score in row_scores.items()
+                    if position in best
+                }
+            if not row_scores:
+                return 0, []
+
+        ranked = sorted(row_scores, key=lambda position: (-row_scores[position], position))
+        return len(ranked), ranked[offset:offset + limit]
@@ -0,0 +1,73 @@
+# page_cache.py
+
+"""Rendered HTML pages with their compressed bodies and ETags.
+
+A page is rendered once per data version and compressed once, with gzip and
+(when the brotli package is installed) brotli. After that, a request is
+answered by choosing a body by Accept-Encoding, or with 304 when the
+client's If-None-Match already names it.
+"""
+
+import gzip
+import hashlib
+from collections import namedtuple
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # Optional: without it pages are offered gzipped only
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; compression would barely help
+MIN_COMPRESS_BYTES = 512
+
+# Pages are compressed when first requested, so brotli runs at a quality that
+# takes about a millisecond a page (11, the best, takes ~70 ms). build_static.py
+# compresses ahead of time and uses 11.
+BROTLI_QUALITY = 5
+
+# A page in every encoding it can be sent in, keyed by Content-Encoding ('' for none)
+Page = namedtuple('Page', ['bodies', 'etag', 'status'])
+
+
+def compress(body, brotli_quality=BROTLI_QUALITY):
+    """The encodings of `body` worth sending: {'': body, 'gzip': ..., 'br': ...}."""
+    bodies = {'': body}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        bodies['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli is not None:
+            bodies['br'] = brotli.compress(body, quality=brotli_quality, mode=brotli.MODE_TEXT)
+    return bodies
+
+
+def make_page(html, status=200):
+    body = html.encode('utf-8')
+    return Page(compress(body), hashlib.blake2b(body, digest_size=12).hexdigest(), status)
+
+
+def choose_encoding(page, accept_encoding):
+    """The smallest body the client accepts, by its Accept-Encoding header."""
+    accepted = {coding.split(';')[0].strip() for coding in accept_encoding.split(',')}
+    for encoding in ('br', 'gzip'):
+        if encoding in accepted and encoding in page.bodies:
+            return encoding
+    return ''
+
+
+def page_response(page, request, cache_control):
+    """Response for `page`: the chosen encoding, or 304 if the client has it already."""
+    encoding = choose_encoding(page, request.headers.get('Accept-Encoding', ''))
+    # Each encoding is different bytes, so each gets its own strong ETag
+    etag = f"{page.etag}-{encoding}" if encoding else page.etag
+
+    if page.status == 200 and etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(page.bodies[encoding], status=page.status, mimetype='text/html')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
@@ -0,0 +1,93 @@
+# query_router.py
+
+"""Decides what a typed query is before any handler runs.
+
+Rules are tried in order. Each one is a precompiled pattern and a function
+that checks the match against the store's indices. A roll number or section
+that isn't in the data, or text that can't be part of a name (emoji,
+punctuation, very long messages), gets its own route with a cheap reply
+instead of reaching a handler. Every decision is counted in
+bot_query_routes_total.
+"""
+
+import re
+from collections import namedtuple
+
+from metrics import REGISTRY
+from name_search import normalize
+from student_store import SECTION_COLUMNS, section_code
+
+QUERY_ROUTES = REGISTRY.counter(
+    'bot_query_routes_total', "Typed queries by the route the router chose.", ('route',))
+
+# Nobody's name is longer than this; longer messages are pasted text
+MAX_QUERY_LENGTH = 100
+
+# The route chosen for a query and what its handler gets: a roll number, a section code or a name
+Route = namedtuple('Route', ['name', 'argument'])
+
+SECTION = re.compile(r'^([A-Za-z]{2,6})\s*[-_]\s*0*(\d{1,3})$')
+ROLL = re.compile(r'^\d{5,9}$')
+LEGACY_SECTION = re.compile(r'^\d{1,2}$')
+DIGITS = re.compile(r'^\d+$')
+LETTER = re.compile(r'[a-z]')
+
+
+class QueryRouter:
+    """Ordered (pattern, classify) rules; the first classify that returns a Route wins."""
+
+    def __init__(self, fallback):
+        self._rules = []
+        self._fallback = fallback
+
+    def add(self, pattern, classify):
+        """
+        Add a rule. `classify(match, query, store)` returns a Route, or None to
+        let the later rules try. A pattern of None always matches.
+        """
+        self._rules.append((pattern, classify))
+
+    def route(self, query, store):
+        for pattern, classify in self._rules:
+            match = pattern.match(query) if pattern is not None else None
+            if pattern is not None and match is None:
+                continue
+            route = classify(match, query, store)
+            if route is not None:
+                break
+        else:
+            route = self._fallback(query, store)
+        QUERY_ROUTES.inc(route.name)
+        return route
+
+
+def _has_section(store, code):
+    return any(store.section(year, code) is not None for year in SECTION_COLUMNS)
+
+
+def _section_route(name, code, store):
+    return Route(name if _has_section(store, code) else 'unknown_section', code)
+
+
+def build_router(special_rolls=()):
+    """The bot's rules; `special_rolls` are answered even though they aren't in the data."""
+    router = QueryRouter(fallback=_name_or_junk)
+    router.add(None, lambda match, query, store: Route('junk', query) if len(query) > MAX_QUERY_LENGTH else None)
+    # "CSE-5", "cse_05", "IT - 12"
+    router.add(SECTION, lambda match, query, store: _section_route(
+        'section', section_code(match.group(1).upper(), int(match.group(2))), store))
+    router.add(ROLL, lambda match, query, store: Route(
+        'roll' if query in store or query in special_rolls else 'unknown_roll', query))
+    # "5" is CSE-05, as before section codes had a branch
+    router.add(LEGACY_SECTION, lambda match, query, store: _section_route(
+        'legacy_section', section_code('CSE', int(query)), store))
+    # Any other number is a roll number of the wrong length; names have no digits-only form
+    router.add(DIGITS, lambda match, query, store: Route('unknown_roll', query))
+    return router
+
+
+def _name_or_junk(query, store):
+    tokens = normalize(query)
+    if not any(LETTER.search(token) for token in tokens):
+        return Route('junk', query)
+    return Route('name', ' '.join(tokens))
@@ -0,0 +1,180 @@
+# rate_limit.py
+
+"""Per-user rate limiting, a global concurrency cap and request coalescing.
+
+RateLimiter.wrap() puts a handler behind three checks:
+
+- a repeated press of the same inline button within `button_window` seconds
+  is answered and dropped
+- each user has a token bucket of `burst` queries refilled at `rate` per
+  second; a user who runs out gets one "slow down" notice and is ignored
+  until the bucket refills
+- at most `max_concurrent` limited handlers run at once; the rest wait
+
+Exempt users (the admins) skip all three. The limits are plain attributes,
+so /limits can change them while the bot runs.
+
+Coalescer lets identical requests that arrive while one is being computed
+wait for that computation instead of starting their own.
+"""
+
+import asyncio
+import functools
+import time
+
+from config import BUTTON_WINDOW, MAX_CONCURRENT_QUERIES, USER_BURST, USER_RATE
+from metrics import REGISTRY
+
+THROTTLED = REGISTRY.counter(
+    'bot_throttled_total', "Updates dropped by the rate limiter, by reason.", ('reason',))
+COALESCED = REGISTRY.counter(
+    'bot_coalesced_total', "Requests that shared an identical in-flight computation.")
+
+# Past this many tracked users, idle entries are dropped
+MAX_TRACKED_USERS = 50_000
+
+# A throttled user is told at most this often
+NOTICE_INTERVAL = 10.0
+
+SLOW_DOWN_TEXT = "You're sending requests too quickly. Please wait a few seconds and try again."
+
+TUNABLE_LIMITS = ('rate', 'burst', 'max_concurrent', 'button_window')
+
+
+class RateLimiter:
+    def __init__(self, is_exempt=lambda user_id: False, rate=USER_RATE, burst=USER_BURST,
+                 max_concurrent=MAX_CONCURRENT_QUERIES, button_window=BUTTON_WINDOW):
+        self.is_exempt = is_exempt
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.button_window = button_window
+        self.active = 0
+        self._buckets = {}  # user_id -> [tokens, updated, last notice]
+        self._presses = {}  # (user_id, callback data) -> time of the last press
+        self._slots = None
+
+    def limits(self):
+        return {name: getattr(self, name) for name in TUNABLE_LIMITS}
+
+    async def set_limits(self, **limits):
+        """Change any of the tunable limits; waiting handlers see a raised cap at once."""
+        for name, value in limits.items():
+            if name not in TUNABLE_LIMITS:
+                raise ValueError(f"Unknown limit: {name}")
+            setattr(self, name, type(getattr(self, name))(value))
+        async with self._condition():
+            self._slots.notify_all()
+
+    def _condition(self):
+        if self._slots is None:
+            self._slots = asyncio.Condition()
+        return self._slots
+
+    def _take(self, user_id, now):
+        """Take a token from the user's bucket. Returns (allowed, notify)."""
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_USERS:
+                self._prune(now)
+            bucket = self._buckets[user_id] = [self.burst, now, 0.0]
+
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True, False
+
+        notify = now - bucket[2] >= NOTICE_INTERVAL
+        if notify:
+            bucket[2] = now
+        return False, notify
+
+    def _prune(self, now):
+        refill = self.burst / self.rate if self.rate else float('inf')
+        self._buckets = {user_id: bucket for user_id, bucket in self._buckets.items()
+                         if now - bucket[1] < refill}
+        self._presses = {key: pressed for key, pressed in self._presses.items()
+                         if now - pressed < self.button_window}
+
+    def _is_repeat_press(self, user_id, data, now):
+        key = (user_id, data)
+        last = self._presses.get(key)
+        self._presses[key] = now
+        if len(self._presses) >= MAX_TRACKED_USERS:
+            self._prune(now)
+        return last is not None and now - last < self.button_window
+
+    def wrap(self, handler):
+        """Return `handler` behind the button, per-user and concurrency limits."""
+
+        @functools.wraps(handler)
+        async def limited(update, context):
+            user = update.effective_user
+            if user is None or self.is_exempt(user.id):
+                return await handler(update, context)
+
+            now = time.monotonic()
+            query = update.callback_query
+            if query is not None and self._is_repeat_press(user.id, query.data, now):
+                THROTTLED.inc('repeat_button')
+                await query.answer()
+                return
+
+            allowed, notify = self._take(user.id, now)
+            if not allowed:
+                THROTTLED.inc('user_rate')
+                if query is not None:
+                    await query.answer(SLOW_DOWN_TEXT if notify else None)
+                elif notify:
+                    await update.message.reply_text(SLOW_DOWN_TEXT)
+                return
+
+            slots = self._condition()
+            async with slots:
+                await slots.wait_for(lambda: self.active < self.max_concurrent)
+                self.active += 1
+            try:
+                return await handler(update, context)
+            finally:
+                async with slots:
+                    self.active -= 1
+                    slots.notify()
+
+        return limited
+
+
+class Coalescer:
+    """Shares one in-flight computation between callers that ask for the same key."""
+
+    def __init__(self):
+        self._in_flight = {}
+
+    async def run(self, key, compute):
+        """Return the result of `compute()`, or of the identical call already running."""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            COALESCED.inc()
+        # One caller giving up must not cancel the computation for the others
+        return await asyncio.shield(task)
+
+
+def parse_limits(args):
+    """Parse /limits arguments like rate=0.5 burst=5 max_concurrent=16 button_window=2."""
+    limits = {}
+    for arg in args:
+        name, sep, value = arg.partition('=')
+        if not sep or name not in TUNABLE_LIMITS:
+            raise ValueError(f"Unknown argument: {arg}")
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"{name} must be a number, got {value}") from None
+        if number < 0 or (name in ('burst', 'max_concurrent') and number < 1):
+            raise ValueError(f"{name} is out of range: {value}")
+        limits[name] = number
+    return limits
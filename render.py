@@ -0,0 +1,289 @@
+# render.py
+
+"""Reply text shared by the bot handlers and the student store.
+
+Escaping goes through str.translate tables, and whole columns are escaped at
+once when the data is loaded, so a name search page or a roster page is a
+join over fragments rendered ahead of time.
+"""
+
+import re
+from collections import namedtuple
+
+# Telegram's limit for one message, counted in UTF-16 code units
+MAX_MESSAGE_LENGTH = 4096
+
+# Room left on each roster page for its "page 2 of 5, students 101-200 of 480" header
+ROSTER_HEADER_ROOM = 200
+
+# Fields shown for a roll number, in display order
+STUDENT_FIELDS = [
+    ('name', "Name"),
+    ('roll', "Roll No"),
+    ('section-6th', "Section (6th)"),
+    ('section-5th', "Section (5th)"),
+    ('sec2nd', "Section (2nd yr)"),
+    ('phone', "Phone"),
+    ('hostel', "Hostel"),
+    ('kiitmail', "KIIT Email"),
+    ('email', "Email"),
+]
+
+# A ready-to-send reply: message chunks plus the parse mode they were written for
+Reply = namedtuple('Reply', ['chunks', 'parse_mode'])
+
+MARKDOWN_V2_SPECIAL = r"\_*[]()~`>#+-=|{}.!<>"
+MARKDOWN_V2_TABLE = str.maketrans({char: '\\' + char for char in MARKDOWN_V2_SPECIAL})
+HTML_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+
+# Most names and roll numbers need no escaping, and finding that out is much
+# cheaper than a translate() that maps characters to two-character strings
+_MARKDOWN_V2_CHARS = re.compile('[' + re.escape(MARKDOWN_V2_SPECIAL) + ']')
+_HTML_CHARS = re.compile('[&<>"]')
+
+
+def escape_markdown_v2(text):
+    return text.translate(MARKDOWN_V2_TABLE) if _MARKDOWN_V2_CHARS.search(text) else text
+
+
+def escape_html(text):
+    return text.translate(HTML_TABLE) if _HTML_CHARS.search(text) else text
+
+
+def _text_column(df, column):
+    if column not in df.columns:
+        return [''] * len(df)
+    return [value if isinstance(value, str) else '' for value in df[column].tolist()]
+
+
+def escape_column(df, column, escape=escape_markdown_v2):
+    """Escape a whole column of a DataFrame or StudentTable; a missing column or value becomes an empty string."""
+    return [escape(value) for value in _text_column(df, column)]
+
+
+def message_length(text):
+    """Length as Telegram counts it: UTF-16 code units, so emoji count twice."""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _cut_points(text, parse_mode):
+    """
+    Offsets where `text` can be cut without splitting an escape, an HTML tag or
+    entity, a link, or a bold/italic/code span that is still open.
+    """
+    points = []
+    open_spans = set()  # MarkdownV2 markers seen an odd number of times
+    depth = 0  # Open HTML tags, or an unfinished MarkdownV2 link
+    in_url = False  # Inside the (...) of a MarkdownV2 link, where * _ ~ ` are plain characters
+    i, n = 0, len(text)
+    while i < n:
+        if depth == 0 and not open_spans:
+            points.append(i)
+        char = text[i]
+        if parse_mode == 'HTML':
+            if char == '<':
+                end = text.find('>', i)
+                end = n - 1 if end < 0 else end
+                tag = text[i:end + 1]
+                if tag.startswith('</'):
+                    depth = max(0, depth - 1)
+                elif not tag.endswith('/>'):
+                    depth += 1
+                i = end + 1
+                continue
+            if char == '&':
+                end = text.find(';', i, i + 10)
+                if end > 0:
+                    i = end + 1
+                    continue
+        elif parse_mode == 'MarkdownV2':
+            if char == '\\':
+                i += 2  # An escape and the character it escapes stay together
+                continue
+            if in_url:
+                if char == ')':
+                    in_url = False
+                    depth = max(0, depth - 1)
+            elif char == '[':
+                depth += 1
+            elif char == ']' and depth and text.startswith('(', i + 1):
+                in_url = True
+                i += 2
+                continue
+            elif char == ')' and depth:
+                depth -= 1
+            elif char in '*_~`':
+                open_spans ^= {char}
+        i += 1
+    points.append(n)
+    return points
+
+
+def _longest_prefix(text, limit):
+    """Number of characters of `text` that fit in `limit` UTF-16 code units."""
+    units = 0
+    for index, char in enumerate(text):
+        units += 2 if ord(char) > 0xFFFF else 1
+        if units > limit:
+            return index
+    return len(text)
+
+
+def _split_record(record, limit, parse_mode):
+    """Cut one over-long record into pieces of at most `limit`, preferring line breaks."""
+    pieces = []
+    while message_length(record) > limit:
+        fits = _longest_prefix(record, limit)
+        points = [p for p in _cut_points(record, parse_mode) if 0 < p <= fits]
+        if not points:
+            cut = max(fits, 1)  # One unbreakable span longer than a message; cut it anyway
+        else:
+            lines = [p for p in points if record[p - 1] == '\n']
+            spaces = [p for p in points if record[p - 1] == ' ']
+            cut = (lines or spaces or points)[-1]
+        pieces.append(record[:cut])
+        record = record[cut:]
+    pieces.append(record)
+    return pieces
+
+
+def pack_records(records, limit=MAX_MESSAGE_LENGTH, separator="\n\n", parse_mode='MarkdownV2'):
+    """
+    Group whole records into as few messages of at most `limit` as possible.
+
+    Returns a list of record lists; joining each with `separator` gives a
+    message. Records are kept in order, and filling each message before
+    starting the next is the fewest messages possible for that order. A record
+    that is too long on its own is cut at a safe point and its pieces
+    become messages of their own.
+    """
+    groups = []
+    current = []
+    size = 0
+    separator_length = message_length(separator)
+
+    for record in records:
+        length = message_length(record)
+        if length > limit:
+            if current:
+                groups.append(current)
+            groups.extend([piece] for piece in _split_record(record, limit, parse_mode))
+            current, size = [], 0
+            continue
+
+        added = length + (separator_length if current else 0)
+        if current and size + added > limit:
+            groups.append(current)
+            current, size = [], 0
+            added = length
+        current.append(record)
+        size += added
+
+    if current:
+        groups.append(current)
+    return groups
+
+
+def split_message(message, limit=MAX_MESSAGE_LENGTH, separator="\n\n", parse_mode='MarkdownV2'):
+    """Split `message` into as few messages as possible, breaking only between records."""
+    return [separator.join(group) for group in pack_records(message.split(separator), limit, separator, parse_mode)]
+
+
+def get_contact_links(student: dict) -> str:
+    if student is None:
+        return "Roll number not found."
+
+    whatsapp_link = student.get('whatsapp')
+    telegram_link = student.get('telegram')
+
+    links = []
+    if whatsapp_link is not None:
+        links.append(f'<a href="{escape_html(whatsapp_link)}">WhatsApp</a>')
+    else:
+        links.append(" ")
+
+    if telegram_link is not None:
+        links.append(f'<a href="{escape_html(telegram_link)}">Telegram</a>')
+    else:
+        links.append(" ")
+
+    contact_links_message = " | ".join(links)
+    return contact_links_message
+
+
+def render_student_reply(student):
+    """The get_data Reply for one student, or None if there is no student."""
+    if student is None:
+        return None
+
+    # Only add details that are present for this student
+    message_parts = [
+        f"{label}: {escape_html(str(student[column]))}"
+        for column, label in STUDENT_FIELDS
+        if column in student
+    ]
+
+    # Join the message parts with line breaks
+    message = "\n\n".join(message_parts)
+
+    # Retrieve and append contact links if they exist
+    contact_links = get_contact_links(student)
+    if contact_links and contact_links.strip():  # Only add if there are actual links available
+        message += "\n\n" + contact_links.strip()
+
+    # HTML, so an underscore in an email address can't break the contact links
+    return Reply(tuple(split_message(message, parse_mode='HTML')), 'HTML')
+
+
+def render_roster_entries(df):
+    """MarkdownV2 roster entry (name and roll number) for every row of `df`."""
+    return [
+        f"Name: {name}\nRoll No: {roll}\n"
+        for name, roll in zip(escape_column(df, 'name'), escape_column(df, 'roll'))
+    ]
+
+
+def render_roster_pages(title, entries, limit=MAX_MESSAGE_LENGTH):
+    """One section's roster entries packed into pages, as a tuple of MarkdownV2 messages."""
+    groups = pack_records(entries, limit - ROSTER_HEADER_ROOM, "\n") or [[]]
+    total = len(entries)
+
+    pages = []
+    start = 0
+    for page, group in enumerate(groups):
+        header = escape_markdown_v2(
+            f"{title}: page {page + 1} of {len(groups)}, students {start + 1}-{start + len(group)} of {total}")
+        pages.append(f"*{header}*\n\n" + "\n".join(group))
+        start += len(group)
+    return tuple(pages)
+
+
+def hostel_label(hostel):
+    """Hostel name, or "Day Scholar" for anything that is not a KP/QC hostel."""
+    if isinstance(hostel, str) and hostel.startswith(('KP', 'QC')):
+        return hostel
+    return "Day Scholar"
+
+
+def render_result_fragments(df):
+    """MarkdownV2 name search entry for every row of `df`."""
+    # Few distinct hostels, so each label is escaped once
+    labels = {}
+    for hostel in _text_column(df, 'hostel'):
+        if hostel not in labels:
+            labels[hostel] = escape_markdown_v2(hostel_label(hostel))
+    return [
+        f"Name: {name}\nRoll No: {roll}\nSection: {section}\nHostel: {labels[hostel]}\n\n"
+        for name, roll, section, hostel in zip(
+            escape_column(df, 'name'),
+            escape_column(df, 'roll'),
+            escape_column(df, 'section-6th'),
+            _text_column(df, 'hostel'),
+        )
+    ]
+
+
+def render_name_results(fragments, start, total):
+    """MarkdownV2 page of name search results, numbered from `start`."""
+    header = escape_markdown_v2(f"Results {start + 1}-{start + len(fragments)} of {total}")
+    return f"{header}\n\n" + "".join(fragments)
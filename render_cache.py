@@ -0,0 +1,66 @@
+# render_cache.py
+
+"""Bounded LRU cache for rendered replies, tied to the data version."""
+
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class RenderCache:
+    """
+    LRU cache of rendered values keyed by lookup key and data version.
+
+    Entries from an older data version are dropped as soon as a newer
+    version is requested, so a reload invalidates the whole cache.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, version, render):
+        """Return the cached value for `key`, calling `render()` on a miss."""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = render()
+
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = value
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'version': self._version,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,49 @@
+# replay_updates.py
+
+"""Post recorded Telegram updates to a running webhook server.
+
+Usage: python replay_updates.py updates.json [url]
+
+The file holds one update, a JSON array of updates, or one update per line.
+The secret token is read from WEBHOOK_SECRET, as the server does. The URL
+defaults to the local server started with WEBHOOK_REGISTER=0.
+"""
+
+import json
+import sys
+import time
+
+import httpx
+
+from config import WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_SECRET
+
+
+def load_updates(path):
+    with open(path, encoding='utf-8') as f:
+        text = f.read().strip()
+    try:
+        updates = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return updates if isinstance(updates, list) else [updates]
+
+
+def replay(updates, url, secret_token=WEBHOOK_SECRET):
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret_token}
+    statuses = {}
+    start = time.perf_counter()
+    with httpx.Client(headers=headers) as client:
+        for update in updates:
+            status = client.post(url, json=update).status_code
+            statuses[status] = statuses.get(status, 0) + 1
+    return statuses, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    url = sys.argv[2] if len(sys.argv) > 2 else f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}"
+    updates = load_updates(sys.argv[1])
+    statuses, elapsed = replay(updates, url)
+    print(f"Posted {len(updates)} updates in {elapsed:.2f} s: "
+          + ", ".join(f"{count} x HTTP {status}" for status, count in sorted(statuses.items())))
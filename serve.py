@@ -0,0 +1,57 @@
+# serve.py
+
+"""Production server for the student web UI: preforked gunicorn workers.
+
+The Flask app, and with it the student data and its indices, is loaded once
+in the parent before the workers are forked. The workers share those pages
+copy-on-write instead of each loading data.xlsx, so adding workers adds
+little memory. gc.freeze() moves everything loaded so far out of the
+collector's reach; otherwise the first collection in each worker would touch,
+and so copy, every object in the shared heap.
+
+Usage: python serve.py [workers] [bind]
+"""
+
+import gc
+import logging
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+from config import WEB_BIND, WEB_WORKERS
+
+
+def post_fork(server, worker):
+    from app import data
+
+    data.watch()  # The parent's watcher thread was not copied into this worker
+
+
+class WebServer(BaseApplication):
+    def __init__(self, workers=WEB_WORKERS, bind=WEB_BIND, **options):
+        self.options = {
+            'bind': bind,
+            'workers': workers,
+            'preload_app': True,
+            'post_fork': post_fork,
+            'accesslog': None,
+            **options,
+        }
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app import app
+
+        gc.freeze()
+        return app
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else WEB_WORKERS
+    bind = sys.argv[2] if len(sys.argv) > 2 else WEB_BIND
+    WebServer(workers, bind).run()
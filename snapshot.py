@@ -0,0 +1,132 @@
+# snapshot.py
+
+"""Columnar snapshot of data.xlsx for fast startup.
+
+Parsing the workbook through openpyxl dominates cold start. The snapshot is the
+same table written as an uncompressed Arrow IPC file next to the workbook,
+which loads in one columnar read instead of a parse; the DataFrame still gets
+its own copy of every column. The workbook's mtime, size and
+SHA-256 are stored in the snapshot; a snapshot that no longer matches its
+workbook is rebuilt from Excel.
+
+Build it ahead of time with: python snapshot.py [data.xlsx]
+"""
+
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # Optional: without pyarrow the workbook is always read directly
+    pa = None
+
+SNAPSHOT_SUFFIX = '.arrow'
+
+
+def snapshot_path(source):
+    return os.path.splitext(source)[0] + SNAPSHOT_SUFFIX
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_metadata(source, with_hash=True):
+    stat = os.stat(source)
+    metadata = {
+        'source_mtime': str(stat.st_mtime_ns),
+        'source_size': str(stat.st_size),
+    }
+    if with_hash:
+        metadata['source_sha256'] = file_hash(source)
+    return metadata
+
+
+def write_snapshot(df, source, target=None):
+    """Write `df` as the snapshot of `source`, tagged with the source's metadata."""
+    target = target or snapshot_path(source)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({k.encode(): v.encode() for k, v in source_metadata(source).items()})
+    table = table.replace_schema_metadata(metadata)
+
+    # Write to a temporary file of this process's own first, so readers never see a
+    # half-written snapshot and two processes rebuilding it at once can't interleave
+    fd, partial = tempfile.mkstemp(prefix=os.path.basename(target) + '.', suffix='.tmp',
+                                   dir=os.path.dirname(os.path.abspath(target)))
+    os.close(fd)
+    os.chmod(partial, 0o644)  # mkstemp makes it private; the web UI may run as another user
+    try:
+        with pa.OSFile(partial, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(partial, target)
+    except BaseException:
+        os.remove(partial)
+        raise
+    return target
+
+
+def _is_fresh(metadata, source):
+    current = source_metadata(source, with_hash=False)
+    if (metadata.get(b'source_mtime', b'').decode() == current['source_mtime']
+            and metadata.get(b'source_size', b'').decode() == current['source_size']):
+        return True
+    # The file was touched or copied; it is only stale if the contents changed
+    return metadata.get(b'source_sha256', b'').decode() == file_hash(source)
+
+
+def read_snapshot(source, target=None):
+    """Return the snapshot of `source` as a DataFrame, or None if missing or stale."""
+    target = target or snapshot_path(source)
+    if pa is None or not os.path.exists(target):
+        return None
+
+    try:
+        # to_pandas() copies the columns out, so the file can be closed right after
+        with pa.memory_map(target, 'r') as mapped:
+            reader = ipc.open_file(mapped)
+            if not _is_fresh(reader.schema.metadata or {}, source):
+                logging.info(f"Snapshot {target} is stale")
+                return None
+            return reader.read_all().to_pandas()
+    except Exception as e:
+        logging.error(f"Could not read snapshot {target}: {e}")
+        return None
+
+
+def load_table(source, read_source):
+    """
+    Load `source` from its snapshot when it is fresh.
+
+    Otherwise read it with `read_source(source)` and rebuild the snapshot for
+    the next start.
+    """
+    df = read_snapshot(source)
+    if df is not None:
+        return df
+
+    df = read_source(source)
+    if pa is not None:
+        try:
+            write_snapshot(df, source)
+        except Exception as e:
+            logging.error(f"Could not write snapshot for {source}: {e}")
+    return df
+
+
+if __name__ == "__main__":
+    from student_store import STUDENT_FILE, read_students
+
+    source = sys.argv[1] if len(sys.argv) > 1 else STUDENT_FILE
+    if pa is None:
+        sys.exit("pyarrow is required to build a snapshot")
+    print(f"Wrote {write_snapshot(read_students(source), source)}")
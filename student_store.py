@@ -0,0 +1,311 @@
+# student_store.py
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+
+from columnar import BOYS_HOSTEL, DAY_SCHOLAR, GIRLS_HOSTEL, StudentTable
+from name_search import NameIndex
+from render import render_result_fragments, render_roster_entries, render_roster_pages
+from snapshot import load_table
+
+STUDENT_FILE = 'data.xlsx'
+
+# Every column is kept as text so roll and phone numbers keep their digits
+STUDENT_DTYPES = {
+    'roll': str,
+    'phone': str,
+    'whatsapp': str,
+    'telegram': str,
+    'name': str,
+    'section-6th': str,
+    'section-5th': str,
+    'hostel': str,
+    'kiitmail': str,
+    'email': str
+}
+
+# Section column for each year, as chosen by the year buttons
+SECTION_COLUMNS = {
+    '2': 'sec2nd',
+    '3': 'section-6th',
+}
+
+# Matches "CSE-08", "cse-8" and the odd "CSCE_02" found in the workbook
+SECTION_PATTERN = re.compile(r'^\s*([A-Za-z]+)\s*[-_]\s*0*(\d+)\s*$')
+
+# Everything a section reply needs, computed once per section at load
+Section = namedtuple('Section', [
+    'positions', 'total', 'male', 'female', 'day_scholars', 'students', 'roster_pages',
+])
+
+
+def parse_section(section):
+    """Split a section code like "CSE-08" into ("CSE", 8), or return None."""
+    match = SECTION_PATTERN.match(section) if isinstance(section, str) else None
+    if match is None:
+        return None
+    return match.group(1).upper(), int(match.group(2))
+
+
+def section_code(branch, number):
+    """The canonical form of a section code, e.g. ("CSE", 8) -> "CSE-08"."""
+    return f"{branch}-{number:02d}"
+
+
+def read_students(path=STUDENT_FILE):
+    """Read the student workbook into a DataFrame."""
+    return pd.read_excel(path, dtype=STUDENT_DTYPES)
+
+
+class SectionStudents(Sequence):
+    """A section's students as {'name', 'roll', 'hostel'} dicts, built as they are read."""
+
+    def __init__(self, table, positions):
+        self._table = table
+        self._positions = positions
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        position = self._positions[index]
+        student = {}
+        for column in ('name', 'roll', 'hostel'):
+            value = self._table.value(column, position) if column in self._table.columns else None
+            student[column] = value if isinstance(value, str) else ''
+        return student
+
+
+class StudentStore:
+    """
+    Student table plus the lookup indices built from it.
+
+    The table is held as a compact StudentTable, and the indices are built
+    once when the store is created, so a lookup is a binary search or a
+    dictionary access instead of a scan over the whole table.
+    """
+
+    def __init__(self, df: pd.DataFrame, version=0):
+        self.table = StudentTable(df)
+        self.version = version
+        self._section_index = self._build_section_index(self.table)
+        self._name_index = NameIndex(self.table['name'].tolist() if 'name' in self.table.columns else [])
+        # Each row's name search entry, escaped and rendered once
+        self._result_fragments = render_result_fragments(self.table)
+
+    @staticmethod
+    def _build_section_index(table):
+        index = {}
+        if not len(table):
+            return index
+
+        entries = render_roster_entries(table)  # Escaped once for both years
+
+        for year, column in SECTION_COLUMNS.items():
+            sections = table.categorical(column)
+            if sections is None:
+                continue
+
+            # Sort the rows by section code once, then each code's rows are one slice
+            order = np.argsort(sections.codes, kind='stable').astype(np.int32)
+            bounds = np.searchsorted(sections.codes[order], np.arange(len(sections.categories) + 1))
+
+            # Spellings of one section ("CSE-8", "CSE-08") are merged, parsing each once
+            groups = {}
+            for code, value in enumerate(sections.categories):
+                key = parse_section(value)
+                if key is not None and bounds[code] < bounds[code + 1]:
+                    groups.setdefault(key, []).append(order[bounds[code]:bounds[code + 1]])
+
+            for (branch, number), parts in groups.items():
+                positions = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+                title = f"{section_code(branch, number)}, year {year}"
+                index[(year, branch, number)] = StudentStore._build_section(title, positions, table, entries)
+        return index
+
+    @staticmethod
+    def _build_section(title, positions, table, entries):
+        kinds = np.bincount(table.hostel_kinds[positions], minlength=3)
+        total = len(positions)
+        return Section(
+            positions=positions,
+            total=total,
+            male=int(kinds[BOYS_HOSTEL]),
+            female=int(kinds[GIRLS_HOSTEL]),
+            day_scholars=int(kinds[DAY_SCHOLAR]),
+            students=SectionStudents(table, positions),
+            roster_pages=render_roster_pages(title, [entries[position] for position in positions]),
+        )
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, roll_number):
+        return self.table.find_roll(roll_number) is not None
+
+    def record(self, position):
+        """Return the row at `position` as a dict without the empty fields."""
+        return self.table.row(position)
+
+    def get(self, roll_number):
+        """Return the student with this roll number as a dict, or None."""
+        position = self.table.find_roll(roll_number)
+        if position is None:
+            return None
+        return self.record(position)
+
+    def section(self, year, section):
+        """Return the precomputed Section for a year and code like "CSE-08", or None."""
+        key = parse_section(section)
+        if key is None:
+            return None
+        return self._section_index.get((str(year),) + key)
+
+    def sections(self, year=None):
+        """(year, code, Section) for every section, or every section of one year, in order."""
+        return [
+            (key[0], section_code(key[1], key[2]), section)
+            for key, section in sorted(self._section_index.items())
+            if year is None or key[0] == str(year)
+        ]
+
+    def search_names(self, query, offset=0, limit=20):
+        """Return (total matches, records) for one page of a ranked name search."""
+        total, positions = self._name_index.search(query, offset, limit)
+        return total, [self.record(position) for position in positions]
+
+    def search_name_fragments(self, query, offset=0, limit=20):
+        """Like search_names, but returns the rendered MarkdownV2 entry of each match."""
+        total, positions = self._name_index.search(query, offset, limit)
+        return total, [self._result_fragments[position] for position in positions]
+
+
+def load_store(path=STUDENT_FILE):
+    """Load the student workbook (from its snapshot when fresh) and build its indices."""
+    try:
+        df = load_table(path, read_students)
+    except Exception as e:
+        logging.error(f"Error reading the Excel file: {e}")
+        df = pd.DataFrame()  # Serve an empty store if there is an error
+    return StudentStore(df)
+
+
+class DataStore:
+    """
+    Holds the current StudentStore and replaces it when the workbook changes.
+
+    A new store is fully built before it is swapped in with a single attribute
+    assignment, so readers that take `data.current` always see a complete set
+    of indices. A failed rebuild keeps the previous store.
+    """
+
+    def __init__(self, path=STUDENT_FILE, poll_interval=5.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.last_rebuild_seconds = 0.0
+        self.loaded_at = time.time()
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_pid = None
+
+        start = time.perf_counter()
+        self.current = load_store(path)
+        self.current.version = 1
+        self.last_rebuild_seconds = time.perf_counter() - start
+        self._signature = self._file_signature()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def version(self):
+        return self.current.version
+
+    @property
+    def tag(self):
+        """
+        Identifies the loaded data for ETags. Version numbers are counted per
+        process, so the workbook's mtime and size are part of it too: two
+        workers never give the same tag to different data.
+        """
+        signature = self._signature or (0, 0)
+        return f"{self.version}-{signature[0]:x}-{signature[1]:x}"
+
+    def reload(self):
+        """Rebuild the store from the workbook and swap it in. Returns True on success."""
+        with self._reload_lock:
+            signature = self._file_signature()
+            start = time.perf_counter()
+            try:
+                store = StudentStore(load_table(self.path, read_students), self.current.version + 1)
+            except Exception as e:
+                logging.error(f"Reloading {self.path} failed, keeping version {self.version}: {e}")
+                return False
+
+            self.current = store
+            self._signature = signature
+            self.last_rebuild_seconds = time.perf_counter() - start
+            self.loaded_at = time.time()
+            logging.info(f"Loaded {self.path} as version {store.version} "
+                         f"({len(store)} rows in {self.last_rebuild_seconds:.2f}s)")
+            return True
+
+    def watch(self):
+        """
+        Start a background thread that reloads whenever the workbook changes.
+
+        Threads don't survive fork(), so a forked worker calls this again to
+        get a watcher of its own.
+        """
+        if self._watcher is None or self._watcher_pid != os.getpid():
+            self._watcher = threading.Thread(target=self._watch, name="data-watcher", daemon=True)
+            self._watcher_pid = os.getpid()
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            signature = self._file_signature()
+            if signature is not None and signature != self._signature:
+                self.reload()
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'rows': len(self.current),
+            'loaded_at': self.loaded_at,
+            'last_rebuild_seconds': self.last_rebuild_seconds,
+        }
+
+
+_shared_stores = {}
+_shared_lock = threading.Lock()
+
+
+def shared_store(path=STUDENT_FILE):
+    """
+    Return the process-wide DataStore for `path`.
+
+    The bot and the web UI call this instead of creating their own store, so
+    when both run in one process (webhook mode) they share a single set of
+    indices and a single watcher.
+    """
+    with _shared_lock:
+        store = _shared_stores.get(path)
+        if store is None:
+            store = _shared_stores[path] = DataStore(path)
+        return store
@@ -0,0 +1,62 @@
+# synthetic.py
+
+"""Synthetic student tables with the same columns as data.xlsx, for benchmarks."""
+
+import random
+import pandas as pd
+
+FIRST_NAMES = [
+    "AARAV", "ADITI", "ANKUSH", "ANANYA", "ARJUN", "AYUSH", "DIVYA", "GAURAV",
+    "ISHAAN", "KAVYA", "MEERA", "NIKHIL", "PRIYA", "RAHUL", "REHAN", "RISHIKA",
+    "ROHAN", "SAYANI", "SNEHA", "SOURAMAY", "TANVI", "VIKRAM", "YASH", "ZOYA",
+]
+LAST_NAMES = [
+    "AGARWAL", "BHOWMIK", "DAS", "GUPTA", "JHA", "KUMAR", "MISHRA", "MOHANTY",
+    "MONDAL", "NAYAK", "NOORI", "PANDA", "PATEL", "RAO", "ROY", "SAHOO",
+    "SHARMA", "SINGH", "SINHA", "VERMA",
+]
+# Extra first names are built from syllables so the token vocabulary grows with the table
+SYLLABLES = ["an", "ar", "de", "ha", "ja", "ka", "li", "ma", "na", "pr", "ra", "sh", "ta", "vi", "ya"]
+BRANCHES = [("CSE", 55), ("IT", 6), ("CSSE", 3), ("CSCE", 3)]
+HOSTELS = ["KP-5", "KP-5A", "KP-7C", "KP-10A", "KP-12", "QC-2", "QC-4", "QC-8", "Day Scholar"]
+
+
+def _section(rng):
+    branch, count = rng.choice(BRANCHES)
+    return f"{branch}-{rng.randint(1, count):02d}"
+
+
+def _name(rng):
+    if rng.random() < 0.5:
+        first = rng.choice(FIRST_NAMES)
+    else:
+        first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).upper()
+    if rng.random() < 0.2:
+        first = f"{first} {rng.choice(FIRST_NAMES)}"
+    return f"{first} {rng.choice(LAST_NAMES)}"
+
+
+def make_students(n, seed=0):
+    """Return a DataFrame of `n` fake students with unique roll numbers."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        roll = str(21050000 + i)
+        phone = f"9{rng.randint(100000000, 999999999)}"
+        has_contact = rng.random() < 0.3
+        rows.append({
+            'name': _name(rng),
+            'roll': roll,
+            'hostel': rng.choice(HOSTELS),
+            'sec2nd': _section(rng),
+            'section-6th': _section(rng),
+            'section-5th': _section(rng),
+            'eduskill': None,
+            '4thsemelective': None,
+            'kiitmail': f"{roll}@kiit.ac.in",
+            'email': None,
+            'phone': phone if has_contact else None,
+            'whatsapp': f"https://wa.me/+91{phone}" if has_contact else None,
+            'telegram': f"https://t.me/+91{phone}" if has_contact else None,
+        })
+    return pd.DataFrame(rows, dtype=object)
@@ -0,0 +1,145 @@
+# tests/test_render.py
+
+"""Property tests for the record-packing splitter in render.py.
+
+Records are generated at random, full of escapes, links, HTML tags and
+emoji. Every message must fit the limit, the records must come back whole
+and in order, an over-long record may only be cut where _cut_points allows,
+and no other grouping of the same records may use fewer messages.
+"""
+
+import random
+
+import pytest
+
+from render import (
+    MAX_MESSAGE_LENGTH,
+    _cut_points,
+    escape_html,
+    escape_markdown_v2,
+    message_length,
+    pack_records,
+    split_message,
+)
+
+ALPHABET = "abcdefghij KUMAR_*[]().!-=#|{}~`>+<&\"'😀é\n"
+
+CASES = 200
+
+
+def random_text(rng, length):
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def random_url(rng):
+    # Phone numbers, and Telegram usernames, which often have underscores
+    if rng.random() < 0.5:
+        return f"https://wa.me/+91{rng.randint(10**9, 10**10)}"
+    return "https://t.me/" + ''.join(rng.choice("abcxyz_*~`09") for _ in range(rng.randint(5, 20)))
+
+
+def random_record(rng, parse_mode):
+    text = random_text(rng, rng.randint(1, 120))
+    if parse_mode == 'HTML':
+        record = escape_html(text)
+        if rng.random() < 0.3:
+            record += f' <a href="{escape_html(random_url(rng))}">{escape_html(text[:10])}</a>'
+        if rng.random() < 0.2:
+            record = f"<b>{record}</b>"
+    else:
+        record = escape_markdown_v2(text)
+        if rng.random() < 0.3:
+            record += f" [{escape_markdown_v2(text[:10])}]({random_url(rng)})"
+        if rng.random() < 0.2:
+            record = f"*{record}*"
+    # Now and then a record too long for one message, which has to be cut
+    if rng.random() < 0.02:
+        record = "\n".join([record] * rng.randint(40, 80))
+    return record
+
+
+def fewest_messages(lengths, limit, separator_length):
+    """Optimal message count for ordered records, by dynamic programming."""
+    best = [0] + [float('inf')] * len(lengths)
+    for end in range(1, len(lengths) + 1):
+        size = -separator_length
+        for start in range(end - 1, -1, -1):
+            size += lengths[start] + separator_length
+            if size > limit:
+                break
+            best[end] = min(best[end], best[start] + 1)
+    return best[-1]
+
+
+def random_cases(parse_mode, seed):
+    rng = random.Random(seed)
+    for _ in range(CASES):
+        limit = rng.choice([MAX_MESSAGE_LENGTH, 1000, 300])
+        separator = rng.choice(["\n\n", "\n"])
+        records = [random_record(rng, parse_mode) for _ in range(rng.randint(0, 60))]
+        yield records, limit, separator, pack_records(records, limit, separator, parse_mode)
+
+
+@pytest.mark.parametrize('parse_mode', ['MarkdownV2', 'HTML'])
+def test_messages_fit(parse_mode):
+    for records, limit, separator, groups in random_cases(parse_mode, seed=0):
+        assert all(message_length(separator.join(group)) <= limit for group in groups)
+
+
+@pytest.mark.parametrize('parse_mode', ['MarkdownV2', 'HTML'])
+def test_records_come_back_whole_and_in_order(parse_mode):
+    for records, limit, separator, groups in random_cases(parse_mode, seed=1):
+        # A record too long for one message comes back as consecutive pieces,
+        # cut only where _cut_points allows
+        items = [record for group in groups for record in group]
+        k = 0
+        for record in records:
+            if message_length(record) <= limit:
+                assert items[k] == record
+                k += 1
+                continue
+            safe = set(_cut_points(record, parse_mode))
+            rebuilt = ''
+            while rebuilt != record:
+                assert k < len(items) and record.startswith(rebuilt + items[k])
+                rebuilt += items[k]
+                k += 1
+                assert rebuilt == record or len(rebuilt) in safe, "cut inside an escape, tag or link"
+        assert k == len(items), "extra text in the messages"
+
+
+@pytest.mark.parametrize('parse_mode', ['MarkdownV2', 'HTML'])
+def test_fewest_messages(parse_mode):
+    for records, limit, separator, groups in random_cases(parse_mode, seed=2):
+        if all(message_length(record) <= limit for record in records):
+            lengths = [message_length(record) for record in records]
+            assert len(groups) == fewest_messages(lengths, limit, message_length(separator))
+
+
+def test_split_message_keeps_the_text():
+    rng = random.Random(3)
+    for _ in range(CASES):
+        records = [random_record(rng, 'MarkdownV2').replace("\n\n", "\n") for _ in range(rng.randint(1, 80))]
+        message = "\n\n".join(records)
+        pieces = split_message(message)
+        assert all(message_length(piece) <= MAX_MESSAGE_LENGTH for piece in pieces)
+        if all(message_length(record) <= MAX_MESSAGE_LENGTH for record in records):
+            assert "\n\n".join(pieces) == message
+
+
+def test_link_url_does_not_open_a_span():
+    record = '[WhatsApp](https://wa.me/a_b) x' + escape_markdown_v2('ab.c ' * 1500)
+    for piece in [piece for group in pack_records([record], 1000) for piece in group]:
+        trailing = len(piece) - len(piece.rstrip('\\'))
+        assert trailing % 2 == 0, "escape cut in half"
+
+
+def test_split_message_never_cuts_an_escape():
+    rng = random.Random(4)
+    for _ in range(CASES // 10):
+        text = escape_markdown_v2(random_text(rng, rng.randint(500, 3000)).replace("\n", ""))
+        pieces = split_message(text, limit=rng.randint(50, 400))
+        assert ''.join(pieces) == text
+        for piece in pieces:
+            trailing = len(piece) - len(piece.rstrip('\\'))
+            assert trailing % 2 == 0, "escape cut in half"
@@ -1,51 +1,26 @@
 import pandas as pd
-import os
 from telegram import Update
 from telegram.ext import Updater, CommandHandler, MessageHandler, filters, CallbackContext
 
-# Path to the user log Excel file
-user_log_file = 'user_log.xlsx'
+from command_log import CommandLog
+from config import BOT_API_URL, BOT_TOKEN, require_bot_token
+
+# Append-only log of user commands
+command_log = CommandLog()
 
 # User IDs allowed to access the announcement
 ADMIN_USER_IDS = {6986667023, 6220013615}  # Replace with actual admin user IDs
 
-# Path to the user log Excel file
-user_log_file = 'user_log.xlsx'
-
 def log_user_command(username: str, user_id: int, user_command: str):
-    """Log user commands in an Excel file."""
-    try:
-        # Check if the log file exists
-        if os.path.exists(user_log_file):
-            df = pd.read_excel(user_log_file)
-        else:
-            # Create a new DataFrame if the log file does not exist
-            df = pd.DataFrame(columns=['User ID', 'Username', 'Commands'])
-
-        # Update existing log or append a new entry
-        if user_id in df['User ID'].values:
-            # Get the row index for the user
-            user_index = df.index[df['User ID'] == user_id].tolist()[0]
-            # Append new command
-            current_commands = df.at[user_index, 'Commands']
-            if pd.isna(current_commands):
-                current_commands = ""
-            df.at[user_index, 'Commands'] = f"{current_commands}, {user_command}".strip(", ")
-        else:
-            # Append new entry for a new user
-            new_data = pd.DataFrame([[user_id, username, user_command]], columns=['User ID', 'Username', 'Commands'])
-            df = pd.concat([df, new_data], ignore_index=True)
-
-        # Write the updated DataFrame back to the Excel file
-        df.to_excel(user_log_file, index=False, engine='openpyxl')  # Specify engine
-        print(f"Logged command for user: {username}, command: {user_command}")  # Debug print
-    except Exception as e:
-        print(f"Failed to log command for {username}: {e}")  # Capture and print the error
+    """Queue a user command for the background log writer."""
+    command_log.log(user_id, username, user_command)
+    print(f"Logged command for user: {username}, command: {user_command}")  # Debug print
 
 def get_user_list():
-    """Return the DataFrame of logged user data."""
-    if os.path.exists(user_log_file):
-        return pd.read_excel(user_log_file)
+    """Return the DataFrame of logged users."""
+    users = command_log.users()
+    if users:
+        return pd.DataFrame(users, columns=['User ID', 'Username'])
     return None
 
 def is_authorized(user_id: int) -> bool:
@@ -79,11 +54,9 @@ def handle_message(update: Update, context: CallbackContext):
     log_user_command(username, user_id, user_command)
 
 def main():
-    # Your bot's token
-    TOKEN = 'YOUR_TELEGRAM_BOT_TOKEN'  # Replace with your actual Telegram bot token
-    
-    # Create the Updater and pass it your bot's token
-    updater = Updater(token=TOKEN, use_context=True)
+    require_bot_token()
+    # The token and API server come from config.py (BOT_TOKEN, BOT_API_URL)
+    updater = Updater(token=BOT_TOKEN, base_url=BOT_API_URL, use_context=True)
 
     # Get the dispatcher to register handlers
     dp = updater.dispatcher
@@ -0,0 +1,144 @@
+# webhook.py
+
+"""Webhook mode: Telegram updates and the student web UI on one ASGI server.
+
+Telegram POSTs each update to WEBHOOK_PATH. The update is checked against
+the secret token and queued for the Application, which processes up to
+CONCURRENT_UPDATES of them at once. Every other request goes to the Flask
+app, run on a thread pool, so the bot and the web UI share one process and
+one set of student indices.
+
+To try it locally without Telegram, start the bot with WEBHOOK_REGISTER=0
+and post recorded updates with replay_updates.py.
+"""
+
+import hmac
+import json
+import logging
+import secrets
+
+import uvicorn
+from a2wsgi import WSGIMiddleware
+from telegram import Update
+
+from config import (
+    WEB_THREADS,
+    WEBHOOK_LISTEN,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_REGISTER,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+
+SECRET_HEADER = b'x-telegram-bot-api-secret-token'
+
+# Telegram updates are small; anything bigger is not from Telegram
+MAX_UPDATE_BYTES = 1024 * 1024
+
+
+async def _read_body(receive, limit):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > limit:
+            return None
+        if not message.get('more_body'):
+            return body
+
+
+async def _respond(send, status, text=b''):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain'), (b'content-length', str(len(text)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': text})
+
+
+class WebhookApp:
+    """ASGI app that takes Telegram updates on `path` and hands the rest to `web_app`."""
+
+    def __init__(self, application, web_app, path=WEBHOOK_PATH, secret_token=WEBHOOK_SECRET):
+        self.application = application
+        self.web_app = WSGIMiddleware(web_app, workers=WEB_THREADS)
+        self.path = path
+        self.secret_token = secret_token.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == self.path:
+            await self._handle_update(scope, receive, send)
+        else:
+            await self.web_app(scope, receive, send)
+
+    async def _handle_update(self, scope, receive, send):
+        if scope['method'] != 'POST':
+            await _respond(send, 405, b'Method Not Allowed')
+            return
+
+        token = dict(scope['headers']).get(SECRET_HEADER, b'')
+        if not hmac.compare_digest(token, self.secret_token):
+            logging.warning(f"Rejected webhook call from {scope.get('client')}: bad secret token")
+            await _respond(send, 403, b'Forbidden')
+            return
+
+        body = await _read_body(receive, MAX_UPDATE_BYTES)
+        if body is None:
+            logging.warning(f"Rejected webhook call from {scope.get('client')}: body over {MAX_UPDATE_BYTES} bytes")
+            await _respond(send, 413, b'Payload Too Large')
+            return
+        try:
+            payload = json.loads(body)
+            if not isinstance(payload, dict):
+                raise ValueError(f"expected a JSON object, got {type(payload).__name__}")
+            update = Update.de_json(payload, self.application.bot)
+        except (TypeError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring malformed update: {e}")
+            await _respond(send, 400, b'Bad Request')
+            return
+
+        # Answer Telegram at once; the Application works through the queue on its own
+        await self.application.update_queue.put(update)
+        await _respond(send, 200)
+
+
+async def run_webhook(application, web_app):
+    """Register the webhook and serve updates and the web UI until interrupted."""
+    secret_token = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    server = uvicorn.Server(uvicorn.Config(
+        WebhookApp(application, web_app, WEBHOOK_PATH, secret_token),
+        host=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        lifespan='off',
+        log_level='warning',
+    ))
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    try:
+        if WEBHOOK_REGISTER:
+            await application.bot.set_webhook(
+                url=WEBHOOK_URL + WEBHOOK_PATH,
+                secret_token=secret_token,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+                allowed_updates=Update.ALL_TYPES,
+            )
+            logging.info(f"Webhook set to {WEBHOOK_URL + WEBHOOK_PATH} "
+                         f"(max {WEBHOOK_MAX_CONNECTIONS} connections)")
+        else:
+            logging.info("Not registering the webhook; it must be set with WEBHOOK_SECRET as its secret token")
+            if not WEBHOOK_SECRET:
+                logging.warning("WEBHOOK_SECRET is not set, so every webhook call will be rejected")
+
+        await application.start()
+        logging.info(f"Serving updates and the web UI on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}")
+        await server.serve()
+    finally:
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)